@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+ObsPy FDSN client that reuses one pooled keep-alive HTTP session,
+shared by the seismic fetcher scripts
+"""
+
+import io
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from obspy.clients.fdsn import Client
+from obspy.clients.fdsn.client import raise_on_error
+
+def _retry_after(headers):
+    """Seconds asked for by a Retry-After header, or None (also for the HTTP-date form)"""
+    try:
+        return float(headers['Retry-After'])
+    except (KeyError, ValueError):
+        return None
+
+class HostRateLimiter:
+    """
+    Token bucket for one host. The server's X-RateLimit-Remaining and
+    Retry-After headers, when sent, override the local estimate.
+    """
+    
+    def __init__(self, rate=5.0, capacity=5):
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.refill_rate = rate
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        """Block until the host may receive another request"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.refill_rate)
+                self.updated = now
+                if now < self.blocked_until:
+                    wait = self.blocked_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                else:
+                    wait = (1 - self.tokens) / self.refill_rate
+            time.sleep(wait)
+    
+    def update(self, headers):
+        """Adjust the bucket from the rate-limit headers of a response"""
+        with self.lock:
+            remaining = headers.get('X-RateLimit-Remaining')
+            if remaining is not None and remaining.isdigit():
+                self.tokens = min(self.tokens, float(remaining))
+            
+            retry_after = _retry_after(headers)
+            if retry_after is not None:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+
+class SessionClient(Client):
+    """
+    FDSN client that sends its queries through one keep-alive requests.Session,
+    so repeated requests reuse the connection instead of paying a new TCP/TLS
+    handshake each time (service discovery still uses urllib).
+    With requests_per_second set, requests are paced by a HostRateLimiter.
+    Network errors and 429/5xx answers are retried up to max_attempts times,
+    waiting as long as Retry-After asks or backing off exponentially.
+    """
+    
+    RETRY_STATUS = (429, 500, 502, 503, 504)
+    
+    def __init__(self, *args, pool_size=32, requests_per_second=None, max_attempts=4,
+                 backoff_factor=0.5, backoff_max=60, **kwargs):
+        self.rate_limiter = HostRateLimiter(rate=requests_per_second) if requests_per_second else None
+        self.max_attempts = max_attempts
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.session = requests.Session()
+        # Retries happen in _download, so the adapter itself does not retry
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers['Connection'] = 'keep-alive'
+        super().__init__(*args, **kwargs)
+    
+    def _download(self, url, return_string=False, data=None, use_gzip=None,
+                  content_type=None):
+        if use_gzip is None:
+            use_gzip = self.use_gzip
+        headers = self.request_headers.copy()
+        if content_type:
+            headers['Content-Type'] = content_type
+        if not use_gzip:
+            headers['Accept-Encoding'] = 'identity'
+        
+        for attempt in range(self.max_attempts):
+            last_attempt = attempt == self.max_attempts - 1
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            try:
+                if data is None:
+                    response = self.session.get(url, headers=headers, timeout=self.timeout)
+                else:
+                    response = self.session.post(url, data=data, headers=headers, timeout=self.timeout)
+            except requests.RequestException as e:
+                if last_attempt:
+                    # Let ObsPy turn network failures into its usual FDSN exceptions
+                    raise_on_error(None, e)
+                time.sleep(self._backoff(attempt))
+                continue
+            
+            if self.rate_limiter is not None:
+                self.rate_limiter.update(response.headers)
+            if response.status_code not in self.RETRY_STATUS or last_attempt:
+                break
+            
+            retry_after = _retry_after(response.headers)
+            time.sleep(retry_after if retry_after is not None else self._backoff(attempt))
+        
+        raise_on_error(response.status_code, response.content)
+        if return_string:
+            return response.content
+        return io.BytesIO(response.content)
+    
+    def _backoff(self, attempt):
+        """Exponential backoff (with jitter) before retry number attempt + 1"""
+        return min(self.backoff_max, self.backoff_factor * 2 ** attempt * random.uniform(0.5, 1.5))
@@ -7,31 +7,315 @@ using ObsPy and FDSN web services.
 
 import pandas as pd
 import numpy as np
+import heapq
+import io
+import itertools
 import json
 import os
+import sqlite3
+import threading
 import time
+from contextlib import contextmanager
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
 from datetime import datetime, timedelta
-from obspy import UTCDateTime
-from obspy.clients.fdsn import Client
+from operator import itemgetter
+from obspy import UTCDateTime, read
 from obspy.clients.fdsn.header import FDSNException
+from obspy.io.mseed.util import get_record_information
+from urllib3.exceptions import InsecureRequestWarning
 import warnings
-warnings.filterwarnings('ignore')
+
+# Only silence known-noisy sources so MiniSEED integrity warnings stay visible;
+# SEISMIC_FETCHER_DEV=1 shows every warning while developing
+if os.environ.get('SEISMIC_FETCHER_DEV'):
+    warnings.simplefilter('default')
+else:
+    warnings.filterwarnings('ignore', category=DeprecationWarning, module='obspy')
+    warnings.filterwarnings('ignore', category=FutureWarning, module='obspy')
+    warnings.filterwarnings('ignore', category=InsecureRequestWarning)
+
+try:
+    from fdsn_session import SessionClient
+except ImportError:
+    from backup.fdsn_session import SessionClient
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# HTTP status errors raised by whichever client the session uses
+HTTP_ERRORS = (requests.HTTPError,) + ((httpx.HTTPStatusError,) if httpx is not None else ())
+
+# Answers worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+if httpx is not None:
+    class RetryTransport(httpx.HTTPTransport):
+        """
+        HTTPTransport that also retries RETRY_STATUSES answers (its own retries
+        only cover failed connections), waiting for Retry-After when the server
+        sends it and with exponential backoff otherwise
+        """
+        
+        def __init__(self, *args, max_retries=3, backoff_factor=0.5, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.max_retries = max_retries
+            self.backoff_factor = backoff_factor
+        
+        def handle_request(self, request):
+            for attempt in range(self.max_retries + 1):
+                response = super().handle_request(request)
+                if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                    return response
+                
+                delay = self.backoff_factor * 2 ** attempt
+                retry_after = response.headers.get('Retry-After')
+                if retry_after is not None:
+                    try:
+                        delay = float(retry_after)
+                    except ValueError:
+                        pass  # HTTP-date form; keep the backoff delay
+                response.close()
+                time.sleep(delay)
+
+EARTH_RADIUS_KM = 6371.0
+
+def haversine_km(lat0, lon0, lats, lons, out=None):
+    """
+    Haversine distance in km from one point to arrays of points.
+    Pass a preallocated float64 array as out to avoid allocating the result.
+    """
+    lat_rad = np.radians(lats)
+    return haversine_precomp_km(lat0, lon0, lat_rad, np.cos(lat_rad), np.radians(lons), out)
+
+def haversine_precomp_km(lat0, lon0, lat_rad, cos_lat, lon_rad, out=None):
+    """
+    Haversine distance in km using precomputed station radians and cos(latitude).
+    Every step runs in place on out plus one scratch array, so a call costs two
+    allocations regardless of how many stations are passed.
+    """
+    lat0 = np.radians(lat0)
+    lon0 = np.radians(lon0)
+    
+    if out is None:
+        out = np.empty(np.shape(lat_rad))
+    scratch = np.empty_like(out)
+    
+    # sin^2(dlat/2)
+    np.subtract(lat_rad, lat0, out=out)
+    out *= 0.5
+    np.sin(out, out=out)
+    np.square(out, out=out)
+    
+    # cos(lat0) * cos(lat) * sin^2(dlon/2)
+    np.subtract(lon_rad, lon0, out=scratch)
+    scratch *= 0.5
+    np.sin(scratch, out=scratch)
+    np.square(scratch, out=scratch)
+    scratch *= cos_lat
+    scratch *= np.cos(lat0)
+    
+    out += scratch
+    np.sqrt(out, out=out)
+    np.arcsin(out, out=out)
+    out *= 2 * EARTH_RADIUS_KM
+    return out
+
+class RateLimiter:
+    """
+    Thread-safe token bucket allowing bursts of up to `rate` requests (at
+    least one) and `rate` requests per `per` seconds on average
+    """
+    
+    def __init__(self, rate, per=1.0):
+        # Worker processes get a share of the rate, which can be below one;
+        # the bucket must still hold a whole token or acquire() never returns
+        self.capacity = max(1.0, float(rate))
+        self.tokens = self.capacity
+        self.fill_rate = rate / per
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        """Block until a request may be sent"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.fill_rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.fill_rate
+            time.sleep(wait)
+    
+    def __enter__(self):
+        self.acquire()
+        return self
+    
+    def __exit__(self, *exc):
+        return False
 
 class SeismicDataFetcher:
-    def __init__(self, data_dir='seismic_station_data'):
+    # FDSN web service endpoints queried directly for station discovery
+    FDSN_URLS = {
+        'IRIS': 'https://service.iris.edu',
+        'SCEDC': 'https://service.scedc.caltech.edu',  # Southern California
+        'NCEDC': 'https://service.ncedc.org',  # Northern California
+        'GEONET': 'https://service.geonet.org.nz',  # New Zealand
+        'BGR': 'https://eida.bgr.de',  # Germany
+        'INGV': 'https://webservices.ingv.it',  # Italy
+        'KOERI': 'https://eida.koeri.boun.edu.tr'  # Turkey
+    }
+    
+    # Data center that archives each network; anything else is tried at IRIS first
+    NETWORK_HOME = {
+        'IU': 'IRIS', 'II': 'IRIS', 'US': 'IRIS', 'CU': 'IRIS', 'IC': 'IRIS',
+        'CI': 'SCEDC',
+        'BK': 'NCEDC', 'NC': 'NCEDC',
+        'NZ': 'GEONET',
+        'GR': 'BGR',
+        'IV': 'INGV', 'MN': 'INGV',
+        'KO': 'KOERI'
+    }
+    
+    # Channel selectors requested together; FDSN dataselect expands the wildcards
+    WAVEFORM_CHANNELS = ('BH?', 'HH?', 'EH?')
+    
+    # Major global seismic stations with known coordinates, used as fallback
+    FALLBACK_STATIONS = [
+        # Global Seismographic Network (GSN)
+        {'network': 'IU', 'station': 'ANMO', 'latitude': 34.9459, 'longitude': -106.4572},  # Albuquerque
+        {'network': 'IU', 'station': 'COLA', 'latitude': 64.8738, 'longitude': -147.8616}, # College, Alaska
+        {'network': 'IU', 'station': 'HRV', 'latitude': 42.5064, 'longitude': -71.5583},   # Harvard
+        {'network': 'IU', 'station': 'KONO', 'latitude': 59.6491, 'longitude': 9.5982},    # Norway
+        {'network': 'IU', 'station': 'MAJO', 'latitude': 36.5457, 'longitude': 138.2041},  # Japan
+        {'network': 'IU', 'station': 'RAO', 'latitude': 46.0407, 'longitude': 14.5148},    # Slovenia
+        {'network': 'IU', 'station': 'TATO', 'latitude': 24.9735, 'longitude': 121.4971},  # Taiwan
+        {'network': 'IU', 'station': 'ULN', 'latitude': 47.8651, 'longitude': 107.0532},   # Mongolia
+        {'network': 'GT', 'station': 'PLCA', 'latitude': -31.6729, 'longitude': -63.8792}, # Argentina
+        {'network': 'GT', 'station': 'DBIC', 'latitude': -7.9333, 'longitude': 115.2333},  # Indonesia
+        
+        # Regional networks
+        {'network': 'US', 'station': 'ECSD', 'latitude': 44.0648, 'longitude': -121.4058}, # Oregon
+        {'network': 'US', 'station': 'LKWY', 'latitude': 44.5664, 'longitude': -110.4016}, # Yellowstone
+        {'network': 'CI', 'station': 'PAS', 'latitude': 34.1484, 'longitude': -118.1717},  # Pasadena
+        {'network': 'BK', 'station': 'BRK', 'latitude': 37.8735, 'longitude': -122.2609},  # Berkeley
+        {'network': 'HV', 'station': 'KIP', 'latitude': 21.4233, 'longitude': -158.0095},  # Hawaii
+        
+        # International stations
+        {'network': 'GE', 'station': 'APE', 'latitude': 40.8204, 'longitude': 14.4297},    # Italy
+        {'network': 'GE', 'station': 'SUMG', 'latitude': -0.5527, 'longitude': 100.2381},  # Sumatra
+        {'network': 'AU', 'station': 'ARMA', 'latitude': -30.6267, 'longitude': 151.9501}, # Australia
+        {'network': 'AU', 'station': 'EIDS', 'latitude': -26.3912, 'longitude': 116.7975}, # Australia
+    ]
+    FALLBACK_LATS = np.fromiter((s['latitude'] for s in FALLBACK_STATIONS), dtype=np.float64)
+    FALLBACK_LONS = np.fromiter((s['longitude'] for s in FALLBACK_STATIONS), dtype=np.float64)
+    
+    # The fallback coordinates never change, so the trig terms are computed once
+    FALLBACK_LAT_RAD = np.radians(FALLBACK_LATS)
+    FALLBACK_LON_RAD = np.radians(FALLBACK_LONS)
+    FALLBACK_COS_LAT = np.cos(FALLBACK_LAT_RAD)
+    
+    # Cached station lookups are refreshed after 90 days
+    STATION_CACHE_TTL = 90 * 86400
+    # Farthest any point of a 0.5 degree cell can be from its centre
+    # (0.25 degrees north and east, at most 111.32 km per degree)
+    CELL_HALF_DIAGONAL_KM = 0.25 * 2 ** 0.5 * 111.32
+    
+    def __init__(self, data_dir='seismic_station_data', max_concurrent_fetches=4, chunk_hours=24,
+                 requests_per_second=5, max_requests_per_host=4, max_concurrent_events=8,
+                 http2=True):
         self.data_dir = data_dir
         self.clients = {}
         
-        # Initialize FDSN clients for different data centers
+        # Per data center request budget; replaces fixed sleeps between calls
+        self.requests_per_second = requests_per_second
+        self.limiters = {}
+        
+        # Caps on requests open at once per data center and on events in flight
+        self.max_requests_per_host = max_requests_per_host
+        self.max_concurrent_events = max_concurrent_events
+        self.host_slots = {}
+        
+        # Upper bound on simultaneous waveform requests per event
+        self.max_concurrent_fetches = max_concurrent_fetches
+        
+        # Waveform windows are requested in chunks of this many hours;
+        # chunks that keep failing are kept here for a later retry
+        self.chunk_hours = chunk_hours
+        self.failed_chunks = []
+        
+        # Names of event directories already on disk, filled by scan_event_dirs()
+        self.existing_event_dirs = None
+        
+        # On-disk cache of station lookups per epicenter cell, opened on first use
+        self.station_cache_path = os.path.join(data_dir, '.station_cache.sqlite')
+        self.station_cache = None
+        
+        # FDSN/USGS REST endpoints used by the text-based helpers
+        self.base_url_iris = self.FDSN_URLS['IRIS']
+        self.base_url_usgs = 'https://earthquake.usgs.gov/fdsnws'
+        
+        # Pooled HTTP session shared by every REST call; HTTP/2 when available
+        self.init_session(http2)
+        
+        # Register FDSN data centers; their clients are created on first use
         self.init_clients()
         
         # Create main data directory
         if not os.path.exists(self.data_dir):
             os.makedirs(self.data_dir)
     
+    def init_session(self, http2=True):
+        """
+        Create a keep-alive HTTP session with connection pooling and retries.
+        With httpx[http2] installed, requests to each data center are multiplexed
+        over one HTTP/2 connection (servers without HTTP/2 get HTTP/1.1);
+        otherwise a requests.Session is used.
+        """
+        self.http2 = False
+        if http2 and httpx is not None:
+            limits = httpx.Limits(max_connections=64, max_keepalive_connections=16)
+            try:
+                # The transport owns the connection pool, so it takes the limits
+                self.session = httpx.Client(
+                    follow_redirects=True,
+                    transport=RetryTransport(http2=True, limits=limits, retries=3)
+                )
+                self.http2 = True
+                return
+            except ImportError:
+                print("HTTP/2 support (h2) is not installed, using HTTP/1.1")
+        
+        # Dataselect POSTs are read-only queries, so they are safe to retry too
+        retry = Retry(
+            total=3,
+            backoff_factor=0.5,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(['GET', 'POST'])
+        )
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=64, max_retries=retry)
+        
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+    
     def init_clients(self):
-        """Initialize FDSN clients for different seismic data centers"""
-        client_urls = {
+        """
+        Register the FDSN data centers; ObsPy clients are only constructed
+        (one service-discovery round trip each) when a center is first used
+        """
+        self.client_urls = {
             'IRIS': 'IRIS',
             'USGS': 'USGS', 
             'SCEDC': 'SCEDC',  # Southern California
@@ -43,79 +327,180 @@ class SeismicDataFetcher:
             'KOERI': 'KOERI',  # Turkey
             'JMA': 'JMA'       # Japan
         }
-        
-        for name, url in client_urls.items():
+        self.failed_clients = set()
+    
+    def _get_client(self, name):
+        """Return the ObsPy client for a data center, creating it on first use"""
+        client = self.clients.get(name)
+        if client is None and name not in self.failed_clients:
             try:
-                self.clients[name] = Client(url)
+                client = self.clients.setdefault(name, SessionClient(self.client_urls[name]))
                 print(f"Initialized {name} client")
             except Exception as e:
                 print(f"Failed to initialize {name} client: {e}")
+                self.failed_clients.add(name)
+        return client
+    
+    def warm_clients(self, names=None):
+        """
+        Create the clients for the given data centers (default: all) concurrently,
+        so start-up costs about one handshake instead of one per center
+        """
+        names = [name for name in (names or self.client_urls) if name not in self.clients]
+        if names:
+            with ThreadPoolExecutor(max_workers=len(names)) as executor:
+                list(executor.map(self._get_client, names))
         
         if not self.clients:
             print("Warning: No FDSN clients could be initialized!")
-        else:
-            print(f"Successfully initialized {len(self.clients)} FDSN clients")
+        return self.clients
     
     def get_nearest_stations(self, latitude, longitude, max_radius_km=500, max_stations=5):
         """
-        Find nearest seismic stations using ObsPy FDSN clients
+        Find nearest seismic stations by querying all FDSN data centers concurrently
         """
-        all_stations = []
+        # Events in the same 0.5 degree cell share one inventory, gathered around
+        # the cell centre with the radius widened by the cell's half-diagonal so
+        # it covers the search circle of any epicenter in the cell
+        cell_lat, cell_lon = self._station_cell(latitude, longitude)
+        cache_key = self._station_cache_key(latitude, longitude, max_radius_km)
+        all_stations = self._load_cached_stations(cache_key)
+        if all_stations is not None:
+            print(f"  Using cached station list ({len(all_stations)} stations)")
+        else:
+            all_stations = self._gather_stations(cell_lat, cell_lon, max_radius_km + self.CELL_HALF_DIAGONAL_KM)
+            if all_stations:
+                self._store_cached_stations(cache_key, all_stations)
         
-        # Try each client to get station inventory
-        for client_name, client in self.clients.items():
-            try:
-                print(f"  Querying {client_name} for stations...")
-                
-                # Get station inventory
-                inventory = client.get_stations(
-                    latitude=latitude, 
-                    longitude=longitude,
-                    maxradius=max_radius_km / 111.32,  # Convert km to degrees
-                    level="station",
-                    starttime=UTCDateTime("2010-01-01"),
-                    endtime=UTCDateTime("2024-01-01")
-                )
-                
-                # Extract station information
-                for network in inventory:
-                    for station in network:
-                        distance = self.calculate_distance(
-                            latitude, longitude,
-                            station.latitude, station.longitude
-                        )
-                        
-                        all_stations.append({
-                            'network': network.code,
-                            'station': station.code,
-                            'latitude': station.latitude,
-                            'longitude': station.longitude,
-                            'distance_km': distance,
-                            'client': client_name,
-                            'site_name': station.site.name if station.site else 'Unknown',
-                            'elevation': station.elevation
-                        })
-                        
-            except Exception as e:
-                print(f"    Error querying {client_name}: {e}")
-                continue
+        # Exact distances from this epicenter, then the exact radius
+        self._assign_distances(all_stations, latitude, longitude)
+        all_stations = [s for s in all_stations if s['distance_km'] <= max_radius_km]
         
         # If no stations found from clients, use fallback
         if not all_stations:
             print("  No stations found from FDSN clients, using fallback stations...")
             all_stations = self.get_fallback_stations(latitude, longitude, max_radius_km)
         
-        # Remove duplicates and sort by distance
-        unique_stations = []
-        seen = set()
+        # Remove duplicates (first data center wins) and keep the closest ones
+        stations_by_key = {}
         for station in all_stations:
-            key = f"{station['network']}.{station['station']}"
-            if key not in seen:
-                seen.add(key)
-                unique_stations.append(station)
+            stations_by_key.setdefault(f"{station['network']}.{station['station']}", station)
         
-        unique_stations.sort(key=lambda x: x['distance_km'])
-        return unique_stations[:max_stations]
+        return heapq.nsmallest(max_stations, stations_by_key.values(), key=itemgetter('distance_km'))
+    
+    def _limiter(self, name):
+        """Return the rate limiter for a data center, creating it on first use"""
+        limiter = self.limiters.get(name)
+        if limiter is None:
+            limiter = self.limiters.setdefault(name, RateLimiter(self.requests_per_second))
+        return limiter
+    
+    def _host_slot(self, name):
+        """Return the semaphore bounding open requests to a data center"""
+        slot = self.host_slots.get(name)
+        if slot is None:
+            slot = self.host_slots.setdefault(name, threading.BoundedSemaphore(self.max_requests_per_host))
+        return slot
+    
+    @contextmanager
+    def _throttle(self, name):
+        """Hold one of the data center's request slots and take a rate-limit token"""
+        with self._host_slot(name):
+            self._limiter(name).acquire()
+            yield
+    
+    def _open_station_cache(self):
+        """Open (and create if needed) the SQLite station lookup cache"""
+        if self.station_cache is None:
+            self.station_cache = sqlite3.connect(self.station_cache_path, timeout=30)
+            self.station_cache.execute(
+                'CREATE TABLE IF NOT EXISTS stations '
+                '(key TEXT PRIMARY KEY, stored_at REAL, stations TEXT)'
+            )
+        return self.station_cache
+    
+    def _station_cell(self, latitude, longitude):
+        """Centre of the 0.5 degree grid cell containing the point"""
+        return round(latitude * 2) / 2, round(longitude * 2) / 2
+    
+    def _station_cache_key(self, latitude, longitude, max_radius_km):
+        """Cache key from the 0.5 degree grid cell and the search radius"""
+        cell_lat, cell_lon = self._station_cell(latitude, longitude)
+        return f"{cell_lat:.1f}:{cell_lon:.1f}:{max_radius_km}"
+    
+    def _load_cached_stations(self, key):
+        """Return the cached station list for key, or None if missing or expired"""
+        try:
+            row = self._open_station_cache().execute(
+                'SELECT stored_at, stations FROM stations WHERE key = ?', (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"  Station cache unavailable: {e}")
+            return None
+        
+        if row is None or time.time() - row[0] > self.STATION_CACHE_TTL:
+            return None
+        return json.loads(row[1])
+    
+    def _store_cached_stations(self, key, stations):
+        """Store a freshly gathered station list under key"""
+        try:
+            with self._open_station_cache() as conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO stations VALUES (?, ?, ?)',
+                    (key, time.time(), json.dumps(stations))
+                )
+        except sqlite3.Error as e:
+            print(f"  Could not update station cache: {e}")
+    
+    def _query_center(self, name, base_url, latitude, longitude, max_radius_km):
+        """
+        Query a single data center's station service (text format)
+        """
+        print(f"  Querying {name} for stations...")
+        
+        url = f"{base_url}/fdsnws/station/1/query"
+        params = {
+            'format': 'text',
+            'level': 'station',
+            'latitude': latitude,
+            'longitude': longitude,
+            'maxradius': max_radius_km / 111.32,  # Convert km to degrees
+            'starttime': '2010-01-01',
+            'endtime': '2024-01-01'
+        }
+        
+        with self._throttle(name):
+            response = self.session.get(url, params=params, timeout=30)
+        
+        # 204 means the center has no stations in range
+        if response.status_code == 204:
+            return []
+        response.raise_for_status()
+        
+        stations = self.parse_station_text(response.text, latitude, longitude)
+        for station in stations:
+            station['client'] = name
+        return stations
+    
+    def _gather_stations(self, latitude, longitude, max_radius_km):
+        """
+        Query all data centers in parallel; wall time is bounded by the slowest center
+        """
+        with ThreadPoolExecutor(max_workers=len(self.FDSN_URLS)) as executor:
+            futures = {
+                name: executor.submit(self._query_center, name, url, latitude, longitude, max_radius_km)
+                for name, url in self.FDSN_URLS.items()
+            }
+        
+        all_stations = []
+        for name, future in futures.items():
+            try:
+                all_stations.extend(future.result())
+            except Exception as e:
+                print(f"    Error querying {name}: {e}")
+        
+        return all_stations
     
     def get_stations_iris_text(self, latitude, longitude, max_radius_km):
         """
@@ -133,7 +518,8 @@ class SeismicDataFetcher:
                 'endtime': '2024-01-01'
             }
             
-            response = self.session.get(url, params=params, timeout=30)
+            with self._throttle('IRIS'):
+                response = self.session.get(url, params=params, timeout=30)
             
             if response.status_code == 200:
                 return self.parse_station_text(response.text, latitude, longitude)
@@ -151,7 +537,7 @@ class SeismicDataFetcher:
         """
         try:
             # Use a broader time range to find events with station data
-            url = "https://earthquake.usgs.gov/fdsnws/event/1/query"
+            url = f"{self.base_url_usgs}/event/1/query"
             params = {
                 'format': 'geojson',
                 'latitude': latitude,
@@ -163,7 +549,8 @@ class SeismicDataFetcher:
                 'limit': 50
             }
             
-            response = self.session.get(url, params=params, timeout=30)
+            with self._throttle('USGS'):
+                response = self.session.get(url, params=params, timeout=30)
             
             if response.status_code == 200:
                 data = response.json()
@@ -181,47 +568,19 @@ class SeismicDataFetcher:
         """
         Use predefined major global seismic stations as fallback
         """
-        # Major global seismic stations with known coordinates
-        global_stations = [
-            # Global Seismographic Network (GSN)
-            {'network': 'IU', 'station': 'ANMO', 'latitude': 34.9459, 'longitude': -106.4572},  # Albuquerque
-            {'network': 'IU', 'station': 'COLA', 'latitude': 64.8738, 'longitude': -147.8616}, # College, Alaska
-            {'network': 'IU', 'station': 'HRV', 'latitude': 42.5064, 'longitude': -71.5583},   # Harvard
-            {'network': 'IU', 'station': 'KONO', 'latitude': 59.6491, 'longitude': 9.5982},    # Norway
-            {'network': 'IU', 'station': 'MAJO', 'latitude': 36.5457, 'longitude': 138.2041},  # Japan
-            {'network': 'IU', 'station': 'RAO', 'latitude': 46.0407, 'longitude': 14.5148},    # Slovenia
-            {'network': 'IU', 'station': 'TATO', 'latitude': 24.9735, 'longitude': 121.4971},  # Taiwan
-            {'network': 'IU', 'station': 'ULN', 'latitude': 47.8651, 'longitude': 107.0532},   # Mongolia
-            {'network': 'GT', 'station': 'PLCA', 'latitude': -31.6729, 'longitude': -63.8792}, # Argentina
-            {'network': 'GT', 'station': 'DBIC', 'latitude': -7.9333, 'longitude': 115.2333},  # Indonesia
-            
-            # Regional networks
-            {'network': 'US', 'station': 'ECSD', 'latitude': 44.0648, 'longitude': -121.4058}, # Oregon
-            {'network': 'US', 'station': 'LKWY', 'latitude': 44.5664, 'longitude': -110.4016}, # Yellowstone
-            {'network': 'CI', 'station': 'PAS', 'latitude': 34.1484, 'longitude': -118.1717},  # Pasadena
-            {'network': 'BK', 'station': 'BRK', 'latitude': 37.8735, 'longitude': -122.2609},  # Berkeley
-            {'network': 'HV', 'station': 'KIP', 'latitude': 21.4233, 'longitude': -158.0095},  # Hawaii
-            
-            # International stations
-            {'network': 'GE', 'station': 'APE', 'latitude': 40.8204, 'longitude': 14.4297},    # Italy
-            {'network': 'GE', 'station': 'SUMG', 'latitude': -0.5527, 'longitude': 100.2381},  # Sumatra
-            {'network': 'AU', 'station': 'ARMA', 'latitude': -30.6267, 'longitude': 151.9501}, # Australia
-            {'network': 'AU', 'station': 'EIDS', 'latitude': -26.3912, 'longitude': 116.7975}, # Australia
-        ]
+        distances = haversine_precomp_km(
+            latitude, longitude,
+            self.FALLBACK_LAT_RAD, self.FALLBACK_COS_LAT, self.FALLBACK_LON_RAD
+        )
         
         stations = []
-        for station in global_stations:
-            distance = self.calculate_distance(
-                latitude, longitude, 
-                station['latitude'], station['longitude']
-            )
-            
-            if distance <= max_radius_km:
-                station['distance_km'] = distance
-                station['client'] = 'IRIS'  # Default client
-                station['site_name'] = 'Global Station'
-                station['elevation'] = 0.0
-                stations.append(station)
+        for i in np.flatnonzero(distances <= max_radius_km):
+            station = dict(self.FALLBACK_STATIONS[i])
+            station['distance_km'] = float(distances[i])
+            station['client'] = 'IRIS'  # Default client
+            station['site_name'] = 'Global Station'
+            station['elevation'] = 0.0
+            stations.append(station)
         
         return stations
     
@@ -236,91 +595,106 @@ class SeismicDataFetcher:
                 if line.strip() and not line.startswith('#'):
                     parts = line.split('|')
                     if len(parts) >= 5:
-                        network = parts[0].strip()
-                        station = parts[1].strip()
-                        lat = float(parts[2].strip())
-                        lon = float(parts[3].strip())
-                        
-                        distance = self.calculate_distance(event_lat, event_lon, lat, lon)
-                        
-                        stations.append({
-                            'network': network,
-                            'station': station,
-                            'latitude': lat,
-                            'longitude': lon,
-                            'distance_km': distance
-                        })
+                        station_entry = {
+                            'network': parts[0].strip(),
+                            'station': parts[1].strip(),
+                            'latitude': float(parts[2].strip()),
+                            'longitude': float(parts[3].strip())
+                        }
+                        if len(parts) >= 6:
+                            station_entry['elevation'] = float(parts[4].strip() or 0.0)
+                            station_entry['site_name'] = parts[5].strip() or 'Unknown'
+                        stations.append(station_entry)
         except Exception as e:
             print(f"Error parsing station text: {e}")
         
+        self._assign_distances(stations, event_lat, event_lon)
         return stations
     
     def extract_stations_from_events(self, geojson_data, event_lat, event_lon):
         """
         Extract station information from USGS event data
         """
-        stations = []
+        features = geojson_data.get('features', [])
+        if not features:
+            return []
+        
         try:
-            for feature in geojson_data.get('features', []):
-                props = feature.get('properties', {})
-                coords = feature.get('geometry', {}).get('coordinates', [])
-                
-                if len(coords) >= 2:
-                    lon, lat = coords[0], coords[1]
-                    distance = self.calculate_distance(event_lat, event_lon, lat, lon)
-                    
-                    # Create pseudo-station from event location
-                    # This is a fallback approach using event reporting stations
-                    net = props.get('net', 'US')
-                    code = props.get('code', '')[:4] or 'UNK'
-                    
-                    stations.append({
-                        'network': net,
-                        'station': code,
-                        'latitude': lat,
-                        'longitude': lon,
-                        'distance_km': distance
-                    })
+            # Flatten all features at once; columns are named like 'properties.net'
+            df = pd.json_normalize(features)
+            if 'geometry.coordinates' not in df:
+                return []
+            
+            df = df[df['geometry.coordinates'].str.len() >= 2]
+            coords = df['geometry.coordinates']
+            lats = coords.str[1].astype(float).to_numpy()
+            lons = coords.str[0].astype(float).to_numpy()
+            
+            # Create pseudo-stations from event locations
+            # This is a fallback approach using event reporting stations
+            network = df['properties.net'].fillna('US') if 'properties.net' in df else 'US'
+            if 'properties.code' in df:
+                station = df['properties.code'].fillna('').astype(str).str[:4].replace('', 'UNK')
+            else:
+                station = 'UNK'
+            
+            stations = pd.DataFrame({
+                'network': network,
+                'station': station,
+                'latitude': lats,
+                'longitude': lons,
+                'distance_km': haversine_km(event_lat, event_lon, lats, lons)
+            }, index=df.index)
+            return stations.to_dict('records')
         except Exception as e:
             print(f"Error extracting stations from events: {e}")
+            return []
+    
+    def _assign_distances(self, stations, latitude, longitude):
+        """
+        Set 'distance_km' on every station with a single vectorized Haversine call
+        """
+        if not stations:
+            return
         
-        return stations
+        lats = np.fromiter((s['latitude'] for s in stations), dtype=np.float64, count=len(stations))
+        lons = np.fromiter((s['longitude'] for s in stations), dtype=np.float64, count=len(stations))
+        distances = haversine_km(latitude, longitude, lats, lons)
+        
+        for station, distance in zip(stations, distances.tolist()):
+            station['distance_km'] = distance
     
     def calculate_distance(self, lat1, lon1, lat2, lon2):
         """
         Calculate distance between two points using Haversine formula
         """
-        from math import radians, cos, sin, asin, sqrt
-        
-        # Convert to radians
-        lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-        
-        # Haversine formula
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-        a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-        c = 2 * asin(sqrt(a))
-        r = 6371  # Earth radius in kilometers
-        
-        return c * r
+        return float(haversine_km(lat1, lon1, lat2, lon2))
     
-    def get_seismic_waveforms(self, network, station, start_time, end_time, channels=['BHZ', 'HHZ', 'BHN', 'BHE']):
+    def get_seismic_waveforms(self, network, station, start_time, end_time, channels=WAVEFORM_CHANNELS):
         """
-        Fetch actual seismic waveform data using ObsPy
+        Fetch actual seismic waveform data using ObsPy, asking the network's home
+        data center first and requesting all channels in one call
         """
         waveforms = None
         
         # Convert to UTCDateTime
         starttime = UTCDateTime(start_time)
         endtime = UTCDateTime(end_time)
+        channel = ','.join(channels)
         
-        # Try different clients and channels
-        for client_name, client in self.clients.items():
-            for channel in channels:
-                try:
-                    print(f"        Trying {client_name} for {network}.{station}.{channel}...")
-                    
-                    # Get waveform data
+        # Home data center first, then the rest as fallbacks
+        home = self.NETWORK_HOME.get(network, 'IRIS')
+        ordered = sorted(self.client_urls, key=lambda name: name != home)
+        
+        for client_name in ordered:
+            client = self._get_client(client_name)
+            if client is None:
+                continue
+            try:
+                print(f"        Trying {client_name} for {network}.{station}.{channel}...")
+                
+                # Get waveform data
+                with self._throttle(client_name):
                     waveforms = client.get_waveforms(
                         network=network,
                         station=station,
@@ -329,22 +703,174 @@ class SeismicDataFetcher:
                         starttime=starttime,
                         endtime=endtime
                     )
-                    
-                    if waveforms and len(waveforms) > 0:
-                        print(f"        Success! Got {len(waveforms)} traces from {client_name}")
-                        return waveforms, client_name
-                        
-                except FDSNException as e:
-                    if "No data available" not in str(e):
-                        print(f"        FDSN error: {e}")
-                except Exception as e:
-                    print(f"        Error: {e}")
                 
-                # Small delay between requests
-                time.sleep(0.5)
+                if waveforms and len(waveforms) > 0:
+                    print(f"        Success! Got {len(waveforms)} traces from {client_name}")
+                    return waveforms, client_name
+                    
+            except FDSNException as e:
+                if "No data available" not in str(e):
+                    print(f"        FDSN error: {e}")
+            except Exception as e:
+                print(f"        Error: {e}")
         
         return None, None
     
+    def submit_bulk_waveforms(self, executor, client_name, stations, start_time, end_time,
+                              channels=WAVEFORM_CHANNELS):
+        """
+        Queue one dataselect POST per time chunk of the window on the executor.
+        Small chunks keep a transient failure from forcing a full-window retry.
+        """
+        return [
+            ((chunk_start, chunk_end), executor.submit(
+                self._dataselect_post, client_name, stations, chunk_start, chunk_end, channels
+            ))
+            for chunk_start, chunk_end in self._time_chunks(start_time, end_time, self.chunk_hours)
+        ]
+    
+    def collect_bulk_waveforms(self, client_name, stations, start_time, end_time, chunk_futures,
+                               channels=WAVEFORM_CHANNELS):
+        """
+        Route the raw MiniSEED records of every chunk to their station without
+        decoding any samples. Failed chunks are retried once, then queued in
+        self.failed_chunks. Chunks the data center rejects as a POST are fetched
+        per station instead. Returns {(network, station): MiniSEED bytes}.
+        """
+        # Records per chunk, joined in chunk order at the end so each file stays
+        # time-ordered even when some chunks come from the per-station fallback
+        chunk_records = [{} for _ in chunk_futures]
+        # Records straddling a chunk boundary come back in both chunks
+        seen = set()
+        rejected = []
+        for i, ((chunk_start, chunk_end), future) in enumerate(chunk_futures):
+            try:
+                self._split_records_by_station(future.result(), chunk_records[i], seen)
+                continue
+            except HTTP_ERRORS as e:
+                status = getattr(e.response, 'status_code', None)
+                if status is not None and 400 <= status < 500 and status not in (413, 429):
+                    if not rejected:
+                        print(f"        {client_name} rejected bulk request ({e}), trying stations individually...")
+                    rejected.append(i)
+                    continue
+                error = e
+            except Exception as e:
+                error = e
+            
+            print(f"        Chunk {chunk_start} - {chunk_end} from {client_name} failed ({error}), retrying...")
+            try:
+                self._split_records_by_station(
+                    self._dataselect_post(client_name, stations, chunk_start, chunk_end, channels),
+                    chunk_records[i], seen
+                )
+            except Exception as e:
+                print(f"        Chunk {chunk_start} - {chunk_end} from {client_name} failed: {e}")
+                self.failed_chunks.append({
+                    'client': client_name,
+                    'stations': [f"{s['network']}.{s['station']}" for s in stations],
+                    'channels': list(channels),
+                    'start': str(chunk_start),
+                    'end': str(chunk_end),
+                    'error': str(e)
+                })
+        
+        # Only the rejected chunks are fetched per station, one request per
+        # station for each run of consecutive rejected chunks
+        for _, run in itertools.groupby(enumerate(rejected), key=lambda pair: pair[1] - pair[0]):
+            run = [i for _, i in run]
+            run_start = chunk_futures[run[0]][0][0]
+            run_end = chunk_futures[run[-1]][0][1]
+            fetched = self._fetch_individually(stations, run_start, run_end, channels)
+            for data in fetched.values():
+                self._split_records_by_station(data, chunk_records[run[0]], seen)
+        
+        records = {}
+        for part in chunk_records:
+            for key, parts in part.items():
+                records.setdefault(key, []).extend(parts)
+        return {key: b''.join(parts) for key, parts in records.items()}
+    
+    def _split_records_by_station(self, data, records, seen=None):
+        """
+        Append each MiniSEED record in data to records[(network, station)],
+        reading only the fixed record headers. Records whose
+        (network, station, location, channel, start) is already in seen are skipped.
+        """
+        offset = 0
+        buffer = io.BytesIO(data)
+        while offset < len(data):
+            try:
+                info = get_record_information(buffer, offset)
+            except Exception as e:
+                print(f"        Dropping {len(data) - offset} unparseable bytes: {e}")
+                break
+            record_length = info['record_length']
+            if seen is not None:
+                record_id = (info['network'], info['station'], info['location'],
+                             info['channel'], info['starttime'].ns)
+                if record_id in seen:
+                    offset += record_length
+                    continue
+                seen.add(record_id)
+            records.setdefault((info['network'], info['station']), []).append(
+                data[offset:offset + record_length]
+            )
+            offset += record_length
+    
+    def _fetch_individually(self, stations, start_time, end_time, channels):
+        """
+        Per-station fallback for data centers that do not accept dataselect POSTs
+        """
+        # Each station tries its home data center first, so set those up together
+        self.warm_clients({self.NETWORK_HOME.get(s['network'], 'IRIS') for s in stations})
+        
+        results = {}
+        for station in stations:
+            waveforms, _ = self.get_seismic_waveforms(
+                station['network'], station['station'], start_time, end_time, channels=list(channels)
+            )
+            if waveforms:
+                buffer = io.BytesIO()
+                waveforms.write(buffer, format='MSEED')
+                results[(station['network'], station['station'])] = buffer.getvalue()
+        return results
+    
+    def _dataselect_post(self, client_name, stations, start_time, end_time, channels):
+        """
+        Send all station/channel selections for one time range in one POST body;
+        returns the raw MiniSEED bytes (empty if there is no data)
+        """
+        start = UTCDateTime(start_time).strftime('%Y-%m-%dT%H:%M:%S')
+        end = UTCDateTime(end_time).strftime('%Y-%m-%dT%H:%M:%S')
+        body = '\n'.join(
+            f"{station['network']} {station['station']} * {channel} {start} {end}"
+            for station in stations for channel in channels
+        )
+        
+        url = f"{self.FDSN_URLS[client_name]}/fdsnws/dataselect/1/query"
+        # httpx takes a raw body as content=, requests as data=
+        body_arg = {'content': body} if self.http2 else {'data': body}
+        with self._throttle(client_name):
+            response = self.session.post(url, headers={'Content-Type': 'text/plain'}, timeout=120, **body_arg)
+        
+        # 204 means none of the selections have data
+        if response.status_code == 204:
+            return b''
+        response.raise_for_status()
+        return response.content
+    
+    def _time_chunks(self, start_time, end_time, hours=24):
+        """
+        Yield contiguous (start, end) UTCDateTime pairs covering the time window
+        """
+        chunk_start = UTCDateTime(start_time)
+        end = UTCDateTime(end_time)
+        while chunk_start < end:
+            chunk_end = min(chunk_start + hours * 3600, end)
+            yield chunk_start, chunk_end
+            chunk_start = chunk_end
+    
     def save_waveform_data(self, waveforms, filepath, format='MSEED'):
         """
         Save waveform data to file
@@ -356,43 +882,55 @@ class SeismicDataFetcher:
             print(f"Error saving waveforms: {e}")
             return False
     
+    def save_waveform_bytes(self, data, filepath):
+        """
+        Write raw MiniSEED bytes to file as received from the data center
+        """
+        try:
+            with open(filepath, 'wb') as f:
+                f.write(data)
+            return True
+        except OSError as e:
+            print(f"Error saving waveforms: {e}")
+            return False
+    
+    def write_json(self, filepath, data):
+        """
+        Write data as indented JSON, using orjson when it is installed
+        """
+        if orjson is not None:
+            with open(filepath, 'wb') as f:
+                f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+        else:
+            with open(filepath, 'w') as f:
+                json.dump(data, f, indent=2)
+    
     def create_waveform_summary(self, waveforms):
         """
         Create summary information about waveforms
         """
-        summary = {
-            'traces': [],
-            'total_traces': len(waveforms),
-            'sampling_rates': [],
-            'channels': set(),
-            'start_times': [],
-            'end_times': []
-        }
-        
-        for trace in waveforms:
-            trace_info = {
-                'network': trace.stats.network,
-                'station': trace.stats.station,
-                'location': trace.stats.location,
-                'channel': trace.stats.channel,
-                'sampling_rate': trace.stats.sampling_rate,
-                'npts': trace.stats.npts,
-                'starttime': str(trace.stats.starttime),
-                'endtime': str(trace.stats.endtime),
-                'duration_hours': (trace.stats.endtime - trace.stats.starttime) / 3600.0
-            }
-            
-            summary['traces'].append(trace_info)
-            summary['sampling_rates'].append(trace.stats.sampling_rate)
-            summary['channels'].add(trace.stats.channel)
-            summary['start_times'].append(str(trace.stats.starttime))
-            summary['end_times'].append(str(trace.stats.endtime))
+        columns = ['network', 'station', 'location', 'channel', 'sampling_rate', 'npts', 'starttime', 'endtime']
         
-        # Convert sets to lists for JSON serialization
-        summary['channels'] = list(summary['channels'])
-        summary['unique_sampling_rates'] = list(set(summary['sampling_rates']))
+        # One tuple per trace, then every aggregate is a column operation
+        df = pd.DataFrame(
+            [(t.stats.network, t.stats.station, t.stats.location, t.stats.channel,
+              t.stats.sampling_rate, t.stats.npts, str(t.stats.starttime), str(t.stats.endtime))
+             for t in waveforms],
+            columns=columns
+        )
+        # ObsPy defines endtime as starttime + (npts - 1) / sampling_rate
+        samples = (df['npts'] - 1).clip(lower=0)
+        df['duration_hours'] = (samples / df['sampling_rate'].where(df['sampling_rate'] > 0) / 3600.0).fillna(0.0)
         
-        return summary
+        return {
+            'traces': df.to_dict('records'),
+            'total_traces': len(df),
+            'sampling_rates': df['sampling_rate'].tolist(),
+            'channels': df['channel'].unique().tolist(),
+            'start_times': df['starttime'].tolist(),
+            'end_times': df['endtime'].tolist(),
+            'unique_sampling_rates': df['sampling_rate'].unique().tolist()
+        }
     
     def get_earthquake_catalog_data(self, latitude, longitude, start_time, end_time, radius_km=200):
         """
@@ -411,7 +949,8 @@ class SeismicDataFetcher:
                 'orderby': 'time'
             }
             
-            response = self.session.get(url, params=params, timeout=30)
+            with self._throttle('USGS'):
+                response = self.session.get(url, params=params, timeout=30)
             
             if response.status_code == 200:
                 return response.json()
@@ -423,6 +962,14 @@ class SeismicDataFetcher:
             print(f"Error fetching catalog data: {e}")
             return None
     
+    def scan_event_dirs(self):
+        """
+        Record the event directories already present in the data directory
+        """
+        with os.scandir(self.data_dir) as entries:
+            self.existing_event_dirs = {entry.name for entry in entries if entry.is_dir()}
+        return self.existing_event_dirs
+    
     def process_earthquake(self, row, index, total):
         """
         Process a single earthquake event and fetch seismic data
@@ -438,28 +985,32 @@ class SeismicDataFetcher:
             
             print(f"Processing {index}/{total}: {title}")
             
-            # Parse datetime
-            try:
-                event_time = pd.to_datetime(date_str, format='%d-%m-%Y %H:%M')
-            except:
+            # Use the time pre-parsed by fetch_all_earthquake_data when available
+            event_time = row.get('event_time')
+            if event_time is None or pd.isna(event_time):
                 try:
-                    event_time = pd.to_datetime(date_str)
+                    event_time = pd.to_datetime(date_str, format='%d-%m-%Y %H:%M')
                 except:
-                    print(f"Could not parse date: {date_str}")
-                    return None
+                    try:
+                        event_time = pd.to_datetime(date_str)
+                    except:
+                        print(f"Could not parse date: {date_str}")
+                        return None
             
             # Create safe directory name
             safe_title = "".join(c for c in title if c.isalnum() or c in (' ', '-', '_')).rstrip()
             safe_title = safe_title.replace(' ', '_')[:100]  # Limit length
             
-            event_dir = os.path.join(self.data_dir, f"{event_time.strftime('%Y%m%d_%H%M')}_M{magnitude}_{safe_title}")
+            dir_name = f"{event_time.strftime('%Y%m%d_%H%M')}_M{magnitude}_{safe_title}"
+            event_dir = os.path.join(self.data_dir, dir_name)
             
-            if os.path.exists(event_dir):
+            # Skip check against one directory scan instead of a stat() per event
+            if self.existing_event_dirs is None:
+                self.scan_event_dirs()
+            if dir_name in self.existing_event_dirs:
                 print(f"Directory already exists, skipping: {safe_title}")
                 return event_dir
             
-            os.makedirs(event_dir, exist_ok=True)
-            
             # Define time periods (1 month before and after)
             before_start = event_time - timedelta(days=30)
             before_end = event_time - timedelta(hours=1)  # Stop 1 hour before event
@@ -497,21 +1048,24 @@ class SeismicDataFetcher:
                     'status': 'no_stations_found'
                 }
                 
-                with open(os.path.join(event_dir, 'metadata.json'), 'w') as f:
-                    json.dump(metadata, f, indent=2)
+                os.makedirs(event_dir, exist_ok=True)
+                self.existing_event_dirs.add(dir_name)
+                self.write_json(os.path.join(event_dir, 'metadata.json'), metadata)
                 
                 return event_dir
             
             print(f"  Found {len(stations)} stations")
             
-            # Create subdirectories
+            # Create subdirectories (this also creates the event directory)
             before_dir = os.path.join(event_dir, 'before_event')
             after_dir = os.path.join(event_dir, 'after_event')
             os.makedirs(before_dir, exist_ok=True)
             os.makedirs(after_dir, exist_ok=True)
+            self.existing_event_dirs.add(dir_name)
             
             # Fetch seismic waveform data from stations
             station_data = []
+            stations_by_center = {}
             for i, station in enumerate(stations[:3]):  # Limit to top 3 stations to avoid overwhelming
                 network = station['network']
                 station_code = station['station']
@@ -520,7 +1074,7 @@ class SeismicDataFetcher:
                 
                 print(f"    Station {i+1}: {network}.{station_code} ({distance:.1f} km) via {client_name}")
                 
-                station_info = {
+                station_data.append({
                     'network': network,
                     'station': station_code,
                     'latitude': station['latitude'],
@@ -531,39 +1085,52 @@ class SeismicDataFetcher:
                     'elevation': station.get('elevation', 0.0),
                     'data_available': {'before': False, 'after': False},
                     'waveform_summary': {'before': None, 'after': None}
-                }
-                
-                # Fetch before event waveform data
-                print(f"      Fetching before-event waveforms...")
-                before_waveforms, before_client = self.get_seismic_waveforms(
-                    network, station_code, before_start, before_end
-                )
-                if before_waveforms:
-                    before_file = os.path.join(before_dir, f'{network}_{station_code}_before.mseed')
-                    if self.save_waveform_data(before_waveforms, before_file):
-                        station_info['data_available']['before'] = True
-                        station_info['waveform_summary']['before'] = self.create_waveform_summary(before_waveforms)
-                        print(f"        Saved {len(before_waveforms)} traces from {before_client}")
+                })
                 
-                # Small delay to be respectful to servers
-                time.sleep(2)
-                
-                # Fetch after event waveform data
-                print(f"      Fetching after-event waveforms...")
-                after_waveforms, after_client = self.get_seismic_waveforms(
-                    network, station_code, after_start, after_end
-                )
-                if after_waveforms:
-                    after_file = os.path.join(after_dir, f'{network}_{station_code}_after.mseed')
-                    if self.save_waveform_data(after_waveforms, after_file):
-                        station_info['data_available']['after'] = True
-                        station_info['waveform_summary']['after'] = self.create_waveform_summary(after_waveforms)
-                        print(f"        Saved {len(after_waveforms)} traces from {after_client}")
-                
-                station_data.append(station_info)
+                # Group stations so each data center gets one request per window;
+                # stations found through other services go to their network's home
+                if client_name in self.FDSN_URLS:
+                    center = client_name
+                else:
+                    center = self.NETWORK_HOME.get(network, 'IRIS')
+                stations_by_center.setdefault(center, []).append(station)
+            
+            # Bulk requests per (data center, window, time chunk), issued in parallel;
+            # the worker limit caps simultaneous requests to the data centers
+            windows = {
+                'before': (before_start, before_end, before_dir),
+                'after': (after_start, after_end, after_dir)
+            }
+            fetches = []
+            with ThreadPoolExecutor(max_workers=self.max_concurrent_fetches) as executor:
+                for period, (start, end, period_dir) in windows.items():
+                    for center, center_stations in stations_by_center.items():
+                        chunk_futures = self.submit_bulk_waveforms(
+                            executor, center, center_stations, start, end
+                        )
+                        fetches.append((period, period_dir, start, end, center, center_stations, chunk_futures))
+            
+            station_info_by_key = {(s['network'], s['station']): s for s in station_data}
+            for period, period_dir, start, end, center, center_stations, chunk_futures in fetches:
+                try:
+                    results = self.collect_bulk_waveforms(center, center_stations, start, end, chunk_futures)
+                except Exception as e:
+                    print(f"      Error fetching {period}-event waveforms from {center}: {e}")
+                    continue
                 
-                # Longer delay between stations
-                time.sleep(3)
+                # Write each station's records into the per-station on-disk layout;
+                # the summary only needs trace headers, so no samples are decoded
+                for (network, station_code), data in results.items():
+                    station_info = station_info_by_key.get((network, station_code))
+                    if station_info is None:
+                        continue
+                    filepath = os.path.join(period_dir, f'{network}_{station_code}_{period}.mseed')
+                    if self.save_waveform_bytes(data, filepath):
+                        headers = read(filepath, format='MSEED', headonly=True)
+                        station_info['data_available'][period] = True
+                        station_info['waveform_summary'][period] = self.create_waveform_summary(headers)
+                        print(f"        Saved {len(headers)} {period}-event traces for "
+                              f"{network}.{station_code} from {center}")
             
             # Save metadata
             metadata = {
@@ -592,8 +1159,7 @@ class SeismicDataFetcher:
                 'status': 'completed'
             }
             
-            with open(os.path.join(event_dir, 'metadata.json'), 'w') as f:
-                json.dump(metadata, f, indent=2)
+            self.write_json(os.path.join(event_dir, 'metadata.json'), metadata)
             
             print(f"  Completed processing: {safe_title}")
             return event_dir
@@ -602,9 +1168,57 @@ class SeismicDataFetcher:
             print(f"Error processing earthquake {index}: {e}")
             return None
     
-    def fetch_all_earthquake_data(self, csv_file, max_events=None, start_from=0):
+    def worker_config(self, processes):
+        """
+        Constructor arguments for worker-process fetchers; the request budget
+        and per-host slots are split so all workers together keep the limits
+        """
+        return {
+            'data_dir': self.data_dir,
+            'max_concurrent_fetches': self.max_concurrent_fetches,
+            'chunk_hours': self.chunk_hours,
+            'requests_per_second': self.requests_per_second / processes,
+            'max_requests_per_host': self.max_requests_per_host // processes,
+            'max_concurrent_events': self.max_concurrent_events,
+            'http2': self.http2
+        }
+    
+    def _run_events(self, tasks, processes):
+        """
+        Yield the result of process_earthquake for each task, either in order
+        in-process or as they complete in a pool of worker processes
+        """
+        if processes == 1:
+            # One directory listing replaces a stat() per event for the skip check
+            self.scan_event_dirs()
+            for task in tasks:
+                yield self.process_earthquake(*task)
+            return
+        
+        # At most max_concurrent_events are submitted at once; each finished
+        # event frees its slot for the next one right away
+        tasks = iter(tasks)
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                                 initargs=(self.worker_config(processes),)) as pool:
+            pending = {pool.submit(_process_one, task)
+                       for task in itertools.islice(tasks, self.max_concurrent_events)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    next_task = next(tasks, None)
+                    if next_task is not None:
+                        pending.add(pool.submit(_process_one, next_task))
+                    
+                    event_dir, failed_chunks = future.result()
+                    self.failed_chunks.extend(failed_chunks)
+                    yield event_dir
+    
+    def fetch_all_earthquake_data(self, csv_file, max_events=None, start_from=0, processes=None):
         """
-        Fetch seismic data for all earthquakes in the CSV file
+        Fetch seismic data for all earthquakes in the CSV file.
+        Events are spread over `processes` worker processes (default: one per
+        CPU, at most max_requests_per_host) so MiniSEED parsing and writing
+        overlap; processes=1 runs in-process.
         """
         print("Loading earthquake data...")
         df = pd.read_csv(csv_file)
@@ -617,29 +1231,41 @@ class SeismicDataFetcher:
         else:
             df = df.iloc[start_from:]
         
+        # Parse all event times in one vectorized pass; rows in another format
+        # fall back to per-value parsing
+        df['event_time'] = pd.to_datetime(df['date_time'], format='%d-%m-%Y %H:%M', errors='coerce')
+        unparsed = df['event_time'].isna()
+        if unparsed.any():
+            df.loc[unparsed, 'event_time'] = df.loc[unparsed, 'date_time'].map(
+                lambda value: pd.to_datetime(value, errors='coerce')
+            )
+        
+        # Plain dicts avoid building a pandas Series for every row
+        records = df[['title', 'magnitude', 'date_time', 'event_time', 'latitude', 'longitude', 'location']].to_dict('records')
+        
         print(f"Processing {len(df)} earthquake events...")
         print(f"Data will be saved to: {os.path.abspath(self.data_dir)}")
         
         successful = 0
         failed = 0
         
-        # Process earthquakes sequentially to be respectful to APIs
-        for index, row in df.iterrows():
-            result = self.process_earthquake(row, index - start_from + 1, len(df))
-            
+        # Every worker needs at least one of a data center's request slots, so
+        # there are never more workers than slots and the per-host cap holds
+        processes = processes or min(os.cpu_count() or 1, self.max_concurrent_events)
+        processes = min(processes, self.max_requests_per_host)
+        tasks = [(row, position, len(records)) for position, row in enumerate(records, 1)]
+        
+        for position, result in enumerate(self._run_events(tasks, processes), 1):
             if result:
                 successful += 1
             else:
                 failed += 1
             
             # Progress update
-            if (index - start_from + 1) % 10 == 0:
-                print(f"\nProgress: {index - start_from + 1}/{len(df)} events processed")
+            if position % 10 == 0:
+                print(f"\nProgress: {position}/{len(df)} events processed")
                 print(f"Successful: {successful}, Failed: {failed}")
                 print("-" * 50)
-            
-            # Respectful delay between events
-            time.sleep(3)
         
         print(f"\n=== Processing Complete ===")
         print(f"Total events processed: {len(df)}")
@@ -658,8 +1284,26 @@ class SeismicDataFetcher:
             'apis_used': ['IRIS FDSN', 'USGS FDSN']
         }
         
-        with open(os.path.join(self.data_dir, 'processing_summary.json'), 'w') as f:
-            json.dump(summary, f, indent=2)
+        self.write_json(os.path.join(self.data_dir, 'processing_summary.json'), summary)
+        
+        # Persist chunks that could not be downloaded so they can be retried later
+        if self.failed_chunks:
+            self.write_json(os.path.join(self.data_dir, 'failed_chunks.json'), self.failed_chunks)
+
+# Fetcher owned by each worker process, created once by _init_worker
+_worker_fetcher = None
+
+def _init_worker(config):
+    """Process pool initializer: build this worker's fetcher once"""
+    global _worker_fetcher
+    _worker_fetcher = SeismicDataFetcher(**config)
+
+def _process_one(task):
+    """Process one event in a worker; returns (event_dir, failed chunks)"""
+    row, position, total = task
+    _worker_fetcher.failed_chunks = []
+    event_dir = _worker_fetcher.process_earthquake(row, position, total)
+    return event_dir, _worker_fetcher.failed_chunks
 
 def main():
     """Main function to run the seismic data fetcher"""
@@ -5,23 +5,93 @@ Fetches actual seismic waveform data for all earthquakes in the dataset
 """
 
 import pandas as pd
+import numpy as np
 import json
 import os
+import queue
+import random
+import shelve
 import time
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from math import radians, cos, sin, asin, sqrt
 from datetime import datetime, timedelta
-from obspy import UTCDateTime
-from obspy.clients.fdsn import Client
-from obspy.clients.fdsn.header import FDSNException
+from fnmatch import fnmatch
+from obspy import UTCDateTime, read
+from obspy.clients.fdsn.mass_downloader import CircularDomain, MassDownloader, Restrictions
+from obspy.geodetics import kilometers2degrees
+from obspy.clients.fdsn.header import FDSNException, FDSNNoDataException
 import warnings
 warnings.filterwarnings('ignore')
 
+try:
+    from fdsn_session import SessionClient
+except ImportError:
+    from backup.fdsn_session import SessionClient
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from sklearn.neighbors import BallTree
+except ImportError:
+    BallTree = None
+
+EARTH_RADIUS_KM = 6371
+
+# Station catalog (network, station, latitude, longitude, name)
+STATION_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'global_stations.csv')
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km between two points given in degrees"""
+    lat1 = radians(lat1)
+    lat2 = radians(lat2)
+    sin_dlat = sin((lat2 - lat1) * 0.5)
+    sin_dlon = sin(radians(lon2 - lon1) * 0.5)
+    a = sin_dlat * sin_dlat + cos(lat1) * cos(lat2) * sin_dlon * sin_dlon
+    return 2 * EARTH_RADIUS_KM * asin(sqrt(a))
+
 class ProductionSeismicFetcher:
-    def __init__(self, data_dir='seismic_station_data'):
+    # Channel bands requested per station, in order of preference
+    BAND_PREFERENCE = ('BH?', 'HH?', 'LH?')
+    CHANNELS = ','.join(BAND_PREFERENCE)
+    
+    # Stations fetched per event, and the windows fetched from each station
+    MAX_STATIONS = 3
+    PERIODS = ('before', 'after')
+    
+    # Station channel epochs are looked up again after 30 days (data centers
+    # add channels and backfill archives)
+    CHAN_CACHE_TTL = 30 * 86400
+    
+    def __init__(self, data_dir='seismic_station_data', max_workers=8, max_requests_per_host=4,
+                 use_mass_downloader=False, station_file=None):
         self.data_dir = data_dir
         
+        # Optionally let ObsPy's MassDownloader fetch and write the windows
+        self.use_mass_downloader = use_mass_downloader
+        self._mass_downloader = None
+        
+        # Waveform downloads run in parallel, with at most
+        # max_requests_per_host of them open against IRIS at once
+        self.max_workers = max_workers
+        self.host_slots = threading.BoundedSemaphore(max_requests_per_host)
+        
+        # MSEED files and metadata are written by a single background thread so
+        # disk I/O overlaps with the next event's downloads; the bound (one
+        # event's windows plus its metadata) keeps queued streams from piling
+        # up in memory
+        self._write_q = queue.Queue(maxsize=self.MAX_STATIONS * len(self.PERIODS) + 1)
+        self._writer = threading.Thread(target=self._writer_loop, daemon=True)
+        self._writer.start()
+        
         # Initialize IRIS client (most reliable for global data)
         try:
-            self.client = Client('IRIS')
+            self.client = SessionClient('IRIS', requests_per_second=5.0)
             print("✓ IRIS client initialized successfully")
         except Exception as e:
             print(f"✗ Failed to initialize IRIS client: {e}")
@@ -31,77 +101,137 @@ class ProductionSeismicFetcher:
         if not os.path.exists(self.data_dir):
             os.makedirs(self.data_dir)
         
-        # Global station list (expanded for worldwide coverage)
-        self.global_stations = [
-            # Americas
-            {'network': 'IU', 'station': 'ANMO', 'latitude': 34.9459, 'longitude': -106.4572, 'name': 'Albuquerque, NM'},
-            {'network': 'IU', 'station': 'HRV', 'latitude': 42.5064, 'longitude': -71.5583, 'name': 'Harvard, MA'},
-            {'network': 'IU', 'station': 'COLA', 'latitude': 64.8738, 'longitude': -147.8616, 'name': 'College, AK'},
-            {'network': 'IU', 'station': 'CCM', 'latitude': 38.0557, 'longitude': -91.2446, 'name': 'Cathedral Cave, MO'},
-            {'network': 'US', 'station': 'WMOK', 'latitude': 34.7367, 'longitude': -98.7707, 'name': 'Wichita Mountains, OK'},
-            {'network': 'CI', 'station': 'PAS', 'latitude': 34.1484, 'longitude': -118.1717, 'name': 'Pasadena, CA'},
-            {'network': 'BK', 'station': 'BRK', 'latitude': 37.8735, 'longitude': -122.2609, 'name': 'Berkeley, CA'},
-            {'network': 'IU', 'station': 'SSPA', 'latitude': -40.3084, 'longitude': -70.8601, 'name': 'San Martin, Argentina'},
-            {'network': 'GT', 'station': 'PLCA', 'latitude': -31.6729, 'longitude': -63.8792, 'name': 'Argentina'},
-            
-            # Europe & Middle East
-            {'network': 'IU', 'station': 'KONO', 'latitude': 59.6491, 'longitude': 9.5982, 'name': 'Kongsberg, Norway'},
-            {'network': 'IU', 'station': 'KEV', 'latitude': 69.7565, 'longitude': 27.0035, 'name': 'Kevo, Finland'},
-            {'network': 'IU', 'station': 'KIEV', 'latitude': 50.7012, 'longitude': 29.2242, 'name': 'Kiev, Ukraine'},
-            {'network': 'IU', 'station': 'PAB', 'latitude': 39.5446, 'longitude': 4.3499, 'name': 'San Pablo, Spain'},
-            {'network': 'GE', 'station': 'WLF', 'latitude': 49.6555, 'longitude': 6.1508, 'name': 'Walferdange, Luxembourg'},
-            {'network': 'GE', 'station': 'APE', 'latitude': 40.8204, 'longitude': 14.4297, 'name': 'Ape, Italy'},
-            {'network': 'II', 'station': 'ANTO', 'latitude': 39.8683, 'longitude': 32.7934, 'name': 'Ankara, Turkey'},
-            {'network': 'HL', 'station': 'JER', 'latitude': 31.7730, 'longitude': 35.2045, 'name': 'Jerusalem, Israel'},
-            
-            # Asia & Pacific
-            {'network': 'IU', 'station': 'MAJO', 'latitude': 36.5457, 'longitude': 138.2041, 'name': 'Matsushiro, Japan'},
-            {'network': 'IU', 'station': 'TATO', 'latitude': 24.9735, 'longitude': 121.4971, 'name': 'Taipei, Taiwan'},
-            {'network': 'IU', 'station': 'ULN', 'latitude': 47.8651, 'longitude': 107.0532, 'name': 'Ulaanbaatar, Mongolia'},
-            {'network': 'IU', 'station': 'MAKZ', 'latitude': 46.8080, 'longitude': 82.1283, 'name': 'Makanchi, Kazakhstan'},
-            {'network': 'IU', 'station': 'TEIG', 'latitude': 20.2263, 'longitude': 92.7936, 'name': 'Teigaga, Myanmar'},
-            {'network': 'II', 'station': 'NIL', 'latitude': 33.6506, 'longitude': 73.2686, 'name': 'Nilore, Pakistan'},
-            {'network': 'IU', 'station': 'GUMO', 'latitude': 13.5893, 'longitude': 144.8684, 'name': 'Guam, Mariana Is'},
-            {'network': 'IU', 'station': 'FUNA', 'latitude': -8.5259, 'longitude': 179.1966, 'name': 'Funafuti, Tuvalu'},
-            {'network': 'GE', 'station': 'SUMG', 'latitude': -0.5527, 'longitude': 100.2381, 'name': 'Sumatra, Indonesia'},
-            {'network': 'AU', 'station': 'ARMA', 'latitude': -30.6267, 'longitude': 151.9501, 'name': 'Armidale, Australia'},
-            {'network': 'AU', 'station': 'EIDS', 'latitude': -26.3912, 'longitude': 116.7975, 'name': 'Emu Heights, Australia'},
-            
-            # Polar regions
-            {'network': 'IU', 'station': 'PMSA', 'latitude': -64.7744, 'longitude': -64.0489, 'name': 'Palmer Station, Antarctica'},
-            {'network': 'IU', 'station': 'QSPA', 'latitude': -89.9289, 'longitude': 144.4382, 'name': 'South Pole, Antarctica'},
-        ]
+        # Persistent record of each station's channel epochs, so bands that
+        # cannot have data for a window are not requested
+        self._chan_cache = shelve.open(os.path.join(self.data_dir, '.chan_cache'))
+        self._chan_lock = threading.Lock()
+        
+        # Global station list (expanded for worldwide coverage), kept in a CSV
+        # catalog next to this script so it can grow without code changes
+        if station_file is None:
+            station_file = STATION_FILE
+        catalog = pd.read_csv(
+            station_file,
+            dtype={'network': str, 'station': str, 'name': str,
+                   'latitude': np.float64, 'longitude': np.float64},
+            keep_default_na=False
+        )
+        
+        # Structure-of-arrays view of the station list: contiguous coordinate
+        # arrays for the distance math, plus the text fields per station.
+        # global_stations is kept for callers that read it directly.
+        self._lat = catalog['latitude'].to_numpy(dtype=np.float64)
+        self._lon = catalog['longitude'].to_numpy(dtype=np.float64)
+        self._meta = list(zip(catalog['network'], catalog['station'], catalog['name']))
+        self.global_stations = catalog.to_dict('records')
+        
+        # Station coordinates in radians for the vectorized distance calculation
+        self._st_lat = np.radians(self._lat)
+        self._st_lon = np.radians(self._lon)
+        # Only the earthquake side of the formula changes between calls
+        self._cos_st_lat = np.cos(self._st_lat)
+        
+        # Nearest-station results per ~0.1 degree cell, reused by clustered events
+        self._nearest_cache = {}
+        
+        # With scikit-learn available, k-NN queries use a haversine BallTree
+        if BallTree is not None:
+            self._tree = BallTree(np.column_stack([self._st_lat, self._st_lon]), metric='haversine')
+        else:
+            self._tree = None
     
     def calculate_distance(self, lat1, lon1, lat2, lon2):
         """Calculate distance using Haversine formula"""
-        from math import radians, cos, sin, asin, sqrt
-        
-        lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-        a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-        c = 2 * asin(sqrt(a))
-        r = 6371  # Earth radius in kilometers
-        
-        return c * r
+        return haversine_km(lat1, lon1, lat2, lon2)
     
     def get_nearest_stations(self, latitude, longitude, max_radius_km=3000, max_stations=5):
         """Get nearest stations from global list"""
-        stations = []
-        for station in self.global_stations:
-            distance = self.calculate_distance(
-                latitude, longitude,
-                station['latitude'], station['longitude']
-            )
-            
-            if distance <= max_radius_km:
-                station_copy = station.copy()
-                station_copy['distance_km'] = distance
-                stations.append(station_copy)
-        
-        # Sort by distance and return top stations
-        stations.sort(key=lambda x: x['distance_km'])
-        return stations[:max_stations]
+        if max_stations <= 0:
+            return []
+        
+        key = (round(latitude, 1), round(longitude, 1), max_radius_km, max_stations)
+        if key in self._nearest_cache:
+            return self._nearest_cache[key]
+        
+        lat_r, lon_r = radians(latitude), radians(longitude)
+        if self._tree is not None:
+            idx, distances = self._query_tree(lat_r, lon_r, max_radius_km, max_stations)
+        else:
+            idx, distances = self._scan_stations(lat_r, lon_r, max_radius_km, max_stations)
+        
+        # Dicts are only built for the returned stations
+        stations = [self._make_station_dict(i, distance) for i, distance in zip(idx.tolist(), distances.tolist())]
+        
+        self._nearest_cache[key] = stations
+        return stations
+    
+    def _make_station_dict(self, i, distance):
+        """Station record for index i of the station arrays"""
+        network, station, name = self._meta[i]
+        return {
+            'network': network,
+            'station': station,
+            'latitude': float(self._lat[i]),
+            'longitude': float(self._lon[i]),
+            'name': name,
+            'distance_km': distance
+        }
+    
+    def _query_tree(self, lat_r, lon_r, max_radius_km, max_stations):
+        """k nearest stations from the BallTree, closest first, limited to the radius"""
+        k = min(max_stations, len(self._meta))
+        dist_rad, idx = self._tree.query([[lat_r, lon_r]], k=k)
+        distances = dist_rad[0] * EARTH_RADIUS_KM
+        within = distances <= max_radius_km
+        return idx[0][within], distances[within]
+    
+    def _scan_stations(self, lat_r, lon_r, max_radius_km, max_stations):
+        """k nearest stations by a vectorized scan over all stations, closest first"""
+        # Haversine distance to every station in one vectorized pass
+        dlat = self._st_lat - lat_r
+        dlon = self._st_lon - lon_r
+        a = np.sin(dlat/2)**2 + cos(lat_r) * self._cos_st_lat * np.sin(dlon/2)**2
+        distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+        
+        # Pick the closest stations within the radius without sorting all of them
+        idx = np.flatnonzero(distances <= max_radius_km)
+        if max_stations < len(idx):
+            idx = idx[np.argpartition(distances[idx], max_stations - 1)[:max_stations]]
+        idx = idx[np.argsort(distances[idx], kind='stable')]
+        return idx, distances[idx]
+    
+    def _channel_epochs(self, network, station):
+        """
+        (channel, start, end) of every BH/HH/LH channel epoch of a station, with
+        start and end in UTCDateTime nanoseconds (None when open-ended). Cached
+        in the shelf for CHAN_CACHE_TTL; None when the inventory could not be read.
+        """
+        key = f"{network}.{station}"
+        with self._chan_lock:
+            entry = self._chan_cache.get(key)
+        if entry is not None and time.time() - entry['checked'] < self.CHAN_CACHE_TTL:
+            return entry['epochs']
+        
+        try:
+            with self.host_slots:
+                inventory = self.client.get_stations(
+                    network=network, station=station, location='*', channel=self.CHANNELS, level='channel'
+                )
+            epochs = [
+                (channel.code,
+                 channel.start_date.ns if channel.start_date else None,
+                 channel.end_date.ns if channel.end_date else None)
+                for net in inventory for sta in net for channel in sta
+            ]
+        except FDSNNoDataException:
+            epochs = []
+        except Exception:
+            # May be transient; request the waveforms without filtering
+            return None
+        
+        with self._chan_lock:
+            self._chan_cache[key] = {'epochs': epochs, 'checked': time.time()}
+        return epochs
     
     def get_waveforms(self, network, station, start_time, end_time):
         """Get seismic waveforms"""
@@ -112,61 +242,267 @@ class ProductionSeismicFetcher:
         starttime = UTCDateTime(start_time)
         endtime = UTCDateTime(end_time)
         
-        # Try different channel combinations
-        channel_sets = ['BH*', 'HH*', 'LH*', 'BHZ', 'HHZ']
+        # One request for every band the station's channel epochs show can
+        # cover the window; the preferred one is picked locally
+        bands = self.BAND_PREFERENCE
+        epochs = self._channel_epochs(network, station)
+        if epochs is not None:
+            start_ns, end_ns = starttime.ns, endtime.ns
+            bands = tuple(
+                band for band in bands
+                if any(
+                    fnmatch(code, band)
+                    and (epoch_start is None or epoch_start < end_ns)
+                    and (epoch_end is None or epoch_end > start_ns)
+                    for code, epoch_start, epoch_end in epochs
+                )
+            )
+            if not bands:
+                return None, "No data found (no channel open in this window)"
         
-        for channels in channel_sets:
+        waveforms = None
+        for attempt in range(2):
             try:
-                waveforms = self.client.get_waveforms(
-                    network=network,
-                    station=station,
-                    location="*",
-                    channel=channels,
-                    starttime=starttime,
-                    endtime=endtime
-                )
-                
-                if waveforms and len(waveforms) > 0:
-                    return waveforms, f"IRIS-{channels}"
-                    
+                with self.host_slots:
+                    waveforms = self.client.get_waveforms(
+                        network=network,
+                        station=station,
+                        location="*",
+                        channel=','.join(bands),
+                        starttime=starttime,
+                        endtime=endtime
+                    )
+                break
+            except FDSNNoDataException:
+                break
+            except FDSNException:
+                # Retry once after a short, jittered pause
+                if attempt == 0:
+                    time.sleep(random.uniform(1.0, 2.0))
+                    continue
+                return None, "Request failed"
             except Exception:
-                continue
-            
-            time.sleep(0.2)  # Small delay
+                return None, "Request failed"
+        
+        if waveforms and len(waveforms) > 0:
+            for band in bands:
+                selected = waveforms.select(channel=band)
+                if len(selected) > 0:
+                    return selected, f"IRIS-{band}"
         
         return None, "No data found"
     
-    def process_earthquake(self, row, index, total):
-        """Process a single earthquake"""
+    def get_waveforms_bulk(self, stations, start_time, end_time):
+        """
+        Get one time window for several stations in a single bulk request.
+        Returns {(network, station): Stream} with each station's preferred
+        band, as get_waveforms picks it, for stations that returned data.
+        """
+        if not self.client or not stations:
+            return {}
+        
+        starttime = UTCDateTime(start_time)
+        endtime = UTCDateTime(end_time)
+        bulk = [
+            (station['network'], station['station'], '*', channel, starttime, endtime)
+            for station in stations for channel in self.BAND_PREFERENCE
+        ]
+        
+        # Stations missing from the result are retried one by one
         try:
-            # Extract earthquake information
-            title = row['title']
-            magnitude = row['magnitude']
-            date_str = row['date_time']
-            latitude = row['latitude']
-            longitude = row['longitude']
-            location = row['location']
+            with self.host_slots:
+                waveforms = self.client.get_waveforms_bulk(bulk)
+        except FDSNNoDataException:
+            return {}
+        except Exception as e:
+            print(f"    ✗ Bulk request failed - {e}")
+            return {}
+        
+        # Split the combined stream back into one stream per station
+        results = {}
+        for station in stations:
+            selected = waveforms.select(network=station['network'], station=station['station'])
+            for band in self.BAND_PREFERENCE:
+                band_selected = selected.select(channel=band)
+                if len(band_selected) > 0:
+                    results[(station['network'], station['station'])] = band_selected
+                    break
+        return results
+    
+    def _download_windows(self, stations, windows):
+        """
+        Download every window for every station; returns {(i, period): (Stream or None, msg)}.
+        One bulk request per window covers all stations; stations missing from a
+        bulk response are retried individually, all in parallel.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            bulk_futures = {
+                period: executor.submit(self.get_waveforms_bulk, stations, start, end)
+                for period, (start, end, _) in windows.items()
+            }
+            bulk_results = {period: future.result() for period, future in bulk_futures.items()}
             
-            print(f"\\n[{index}/{total}] Processing: {title}")
+            single_futures = {
+                (i, period): executor.submit(
+                    self.get_waveforms, station['network'], station['station'], start, end
+                )
+                for i, station in enumerate(stations)
+                for period, (start, end, _) in windows.items()
+                if (station['network'], station['station']) not in bulk_results[period]
+            }
+        
+        downloads = {key: future.result() for key, future in single_futures.items()}
+        for i, station in enumerate(stations):
+            for period, found in bulk_results.items():
+                waveforms = found.get((station['network'], station['station']))
+                if waveforms is not None:
+                    downloads[(i, period)] = (waveforms, "IRIS-bulk")
+        return downloads
+    
+    def _split_windows(self, fetched, n_stations, windows):
+        """
+        Cut each station's span download into the given windows;
+        returns {(i, period): (Stream or None, msg)}
+        """
+        downloads = {}
+        for i in range(n_stations):
+            waveforms, msg = fetched[(i, 'span')]
+            for period, (start, end, _) in windows.items():
+                if not waveforms:
+                    downloads[(i, period)] = (None, msg)
+                    continue
+                part = waveforms.slice(UTCDateTime(start), UTCDateTime(end))
+                if len(part) > 0:
+                    downloads[(i, period)] = (part, msg)
+                else:
+                    downloads[(i, period)] = (None, "No data in window")
+        return downloads
+    
+    def _mass_download_windows(self, latitude, longitude, stations, windows, event_dir):
+        """
+        Download the windows with ObsPy's MassDownloader (parallel per data center,
+        resumable); returns {(i, period): (Stream or None, msg)} like _download_windows
+        """
+        if self._mass_downloader is None:
+            self._mass_downloader = MassDownloader(providers=['IRIS'])
+        
+        # Only the selected stations, inside a circle just reaching the farthest one
+        domain = CircularDomain(
+            latitude=latitude, longitude=longitude, minradius=0.0,
+            maxradius=kilometers2degrees(max(s['distance_km'] for s in stations) + 10)
+        )
+        
+        downloads = {}
+        for period, (start, end, _) in windows.items():
+            restrictions = Restrictions(
+                starttime=UTCDateTime(start),
+                endtime=UTCDateTime(end),
+                network=','.join(sorted({s['network'] for s in stations})),
+                station=','.join(s['station'] for s in stations),
+                reject_channels_with_gaps=False,
+                minimum_length=0.0,
+                channel_priorities=['BH[ZNE]', 'HH[ZNE]', 'LH[ZNE]'],
+                location_priorities=['', '00', '10']
+            )
             
-            # Parse datetime
-            try:
-                event_time = pd.to_datetime(date_str, format='%d-%m-%Y %H:%M')
-            except:
+            # Files are staged and then saved in the usual per-station layout below
+            with tempfile.TemporaryDirectory(dir=event_dir) as staging:
                 try:
-                    event_time = pd.to_datetime(date_str)
-                except:
-                    print(f"  ✗ Could not parse date: {date_str}")
-                    return None
+                    self._mass_downloader.download(
+                        domain, restrictions,
+                        mseed_storage=staging,
+                        stationxml_storage=os.path.join(event_dir, 'stations'),
+                        threads_per_client=5,
+                        download_chunk_size_in_mb=100,
+                        print_report=False
+                    )
+                except Exception as e:
+                    print(f"    ✗ MassDownloader failed for {period} window: {e}")
+                
+                for i, station in enumerate(stations):
+                    pattern = os.path.join(staging, f"{station['network']}.{station['station']}.*.mseed")
+                    try:
+                        downloads[(i, period)] = (read(pattern), "IRIS-mass")
+                    except Exception:
+                        downloads[(i, period)] = (None, "No data found")
+        return downloads
+    
+    def _writer_loop(self):
+        """Run queued write jobs in order, one at a time"""
+        while True:
+            job = self._write_q.get()
+            try:
+                job()
+            except Exception as e:
+                print(f"    ✗ Write failed - {e}")
+            finally:
+                self._write_q.task_done()
+    
+    def _save_window(self, waveforms, filepath, station_info, period):
+        """Write job for one window; marks it retrieved only once it is on disk"""
+        try:
+            self.write_mseed(waveforms, filepath)
+        except Exception as e:
+            print(f"    ✗ Save failed for {os.path.basename(filepath)} - {e}")
+            return
+        station_info['data_retrieved'][period] = True
+    
+    def _save_metadata(self, event_dir, metadata):
+        """
+        Write job for an event's metadata, queued after its windows so the
+        retrieval flags reflect what was actually written
+        """
+        metadata['successful_retrievals'] = sum(
+            retrieved for station in metadata['stations'] for retrieved in station['data_retrieved'].values()
+        )
+        self.write_json(os.path.join(event_dir, 'metadata.json'), metadata)
+    
+    @staticmethod
+    def write_mseed(waveforms, filepath):
+        """Write a stream as MSEED, STEIM2-compressed when the samples are integers"""
+        if all(tr.data.dtype == np.int32 for tr in waveforms):
+            try:
+                waveforms.write(filepath, format='MSEED', encoding='STEIM2', reclen=4096)
+            except Exception:
+                # Sample differences too large for STEIM2; store them uncompressed
+                waveforms.write(filepath, format='MSEED', encoding='INT32', reclen=4096)
+        else:
+            waveforms.write(filepath, format='MSEED')
+    
+    def write_json(self, filepath, data):
+        """Write data as indented JSON, using orjson when it is installed"""
+        if orjson is not None:
+            with open(filepath, 'wb') as f:
+                f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+        else:
+            with open(filepath, 'w') as f:
+                json.dump(data, f, indent=2)
+    
+    def flush_writes(self):
+        """Block until every queued MSEED file and metadata file has been written"""
+        self._write_q.join()
+    
+    def close(self):
+        """Write everything still queued and close the channel cache; call once the fetcher is done"""
+        self.flush_writes()
+        with self._chan_lock:
+            self._chan_cache.close()
+    
+    def process_earthquake(self, row, index, total):
+        """Process a single earthquake (a row tuple from prepare_events)"""
+        try:
+            # Extract earthquake information
+            title = row.title
+            magnitude = row.magnitude
+            latitude = row.latitude
+            longitude = row.longitude
+            location = row.location
             
-            # Create safe directory name
-            safe_title = "".join(c for c in title if c.isalnum() or c in (' ', '-', '_')).rstrip()
-            safe_title = safe_title.replace(' ', '_')[:60]
+            print(f"\\n[{index}/{total}] Processing: {title}")
             
-            event_dir = os.path.join(
-                self.data_dir,
-                f"{event_time.strftime('%Y%m%d_%H%M')}_M{magnitude}_{safe_title}"
-            )
+            # Parsed time and directory come precomputed from prepare_events
+            event_time = row.event_time
+            event_dir = row.event_dir
             
             if os.path.exists(event_dir):
                 print(f"  → Directory exists, skipping: {os.path.basename(event_dir)}")
@@ -187,7 +523,7 @@ class ProductionSeismicFetcher:
             after_end = event_time + timedelta(days=30)
             
             # Find nearest stations
-            stations = self.get_nearest_stations(latitude, longitude, max_radius_km=4000, max_stations=3)
+            stations = self.get_nearest_stations(latitude, longitude, max_radius_km=4000, max_stations=self.MAX_STATIONS)
             
             if not stations:
                 print(f"  ✗ No stations found within 4000km")
@@ -197,15 +533,28 @@ class ProductionSeismicFetcher:
             for i, station in enumerate(stations, 1):
                 print(f"    {i}. {station['network']}.{station['station']} ({station['distance_km']:.0f}km)")
             
+            windows = {
+                'before': (before_start, before_end, before_dir),
+                'after': (after_start, after_end, after_dir)
+            }
+            
+            # One request spanning both windows, split locally afterwards
+            span = {'span': (before_start, after_end, event_dir)}
+            if self.use_mass_downloader:
+                fetched = self._mass_download_windows(latitude, longitude, stations, span, event_dir)
+            else:
+                fetched = self._download_windows(stations, span)
+            downloads = self._split_windows(fetched, len(stations), windows)
+            
             # Process stations
             station_results = []
-            successful_retrievals = 0
+            queued = 0
             
             for i, station in enumerate(stations, 1):
                 network = station['network']
                 station_code = station['station']
                 
-                print(f"  [{i}/3] {network}.{station_code}:")
+                print(f"  [{i}/{len(stations)}] {network}.{station_code}:")
                 
                 station_info = {
                     'network': network,
@@ -215,46 +564,19 @@ class ProductionSeismicFetcher:
                     'data_retrieved': {'before': False, 'after': False}
                 }
                 
-                # Fetch before-event data
-                before_waveforms, before_msg = self.get_waveforms(
-                    network, station_code, before_start, before_end
-                )
-                
-                if before_waveforms:
-                    before_file = os.path.join(before_dir, f'{network}_{station_code}_before.mseed')
-                    try:
-                        before_waveforms.write(before_file, format='MSEED')
-                        station_info['data_retrieved']['before'] = True
-                        successful_retrievals += 1
-                        file_size = os.path.getsize(before_file) / (1024*1024)
-                        print(f"    ✓ Before: {len(before_waveforms)} traces ({file_size:.1f}MB)")
-                    except Exception as e:
-                        print(f"    ✗ Before: Save failed - {e}")
-                else:
-                    print(f"    ✗ Before: {before_msg}")
-                
-                time.sleep(1)
-                
-                # Fetch after-event data
-                after_waveforms, after_msg = self.get_waveforms(
-                    network, station_code, after_start, after_end
-                )
-                
-                if after_waveforms:
-                    after_file = os.path.join(after_dir, f'{network}_{station_code}_after.mseed')
-                    try:
-                        after_waveforms.write(after_file, format='MSEED')
-                        station_info['data_retrieved']['after'] = True
-                        successful_retrievals += 1
-                        file_size = os.path.getsize(after_file) / (1024*1024)
-                        print(f"    ✓ After: {len(after_waveforms)} traces ({file_size:.1f}MB)")
-                    except Exception as e:
-                        print(f"    ✗ After: Save failed - {e}")
-                else:
-                    print(f"    ✗ After: {after_msg}")
+                for period, (_, _, period_dir) in windows.items():
+                    label = period.capitalize()
+                    waveforms, msg = downloads[(i - 1, period)]
+                    
+                    if waveforms:
+                        filepath = os.path.join(period_dir, f'{network}_{station_code}_{period}.mseed')
+                        self._write_q.put(partial(self._save_window, waveforms, filepath, station_info, period))
+                        queued += 1
+                        print(f"    ✓ {label}: {len(waveforms)} traces (queued for writing)")
+                    else:
+                        print(f"    ✗ {label}: {msg}")
                 
                 station_results.append(station_info)
-                time.sleep(2)  # Respectful delay
             
             # Save metadata
             metadata = {
@@ -272,21 +594,55 @@ class ProductionSeismicFetcher:
                     'after': {'start': after_start.isoformat(), 'end': after_end.isoformat()}
                 },
                 'processing_time': datetime.now().isoformat(),
-                'successful_retrievals': successful_retrievals,
-                'total_possible': len(stations) * 2,
+                'successful_retrievals': 0,
+                'total_possible': len(stations) * len(self.PERIODS),
                 'status': 'completed'
             }
             
-            with open(os.path.join(event_dir, 'metadata.json'), 'w') as f:
-                json.dump(metadata, f, indent=2)
+            # Written by the writer thread once this event's windows are on disk
+            self._write_q.put(partial(self._save_metadata, event_dir, metadata))
             
-            print(f"  ✓ Complete! Retrieved {successful_retrievals}/{len(stations)*2} datasets")
+            print(f"  ✓ Complete! Queued {queued}/{len(stations) * len(self.PERIODS)} datasets for writing")
             return event_dir
             
         except Exception as e:
             print(f"  ✗ Error processing earthquake {index}: {e}")
             return None
     
+    def prepare_events(self, df):
+        """
+        Add the parsed event_time and the output event_dir to every row with
+        whole-column operations; rows whose date cannot be parsed are dropped
+        """
+        df = df.copy()
+        
+        # Parse dates in one pass, then retry the failures with format inference
+        event_time = pd.to_datetime(df['date_time'], format='%d-%m-%Y %H:%M', errors='coerce')
+        unparsed = event_time.isna()
+        if unparsed.any():
+            event_time[unparsed] = pd.to_datetime(df.loc[unparsed, 'date_time'], errors='coerce')
+        df['event_time'] = event_time
+        
+        bad_dates = df['event_time'].isna()
+        if bad_dates.any():
+            print(f"✗ Could not parse {bad_dates.sum()} dates, skipping those events")
+            df = df[~bad_dates].copy()
+        
+        # Safe directory name: keep word characters, spaces and dashes
+        df['safe_title'] = (
+            df['title'].fillna('').astype(str)
+            .str.replace(r'[^\w \-]', '', regex=True)
+            .str.rstrip()
+            .str.replace(' ', '_')
+            .str.slice(0, 60)
+        )
+        df['dir_name'] = (
+            df['event_time'].dt.strftime('%Y%m%d_%H%M') + '_M' + df['magnitude'].astype(str) + '_' + df['safe_title']
+        )
+        # Same result as os.path.join(self.data_dir, dir_name), for the whole column
+        df['event_dir'] = os.path.join(self.data_dir, '') + df['dir_name']
+        return df
+    
     def process_all_earthquakes(self, csv_file, max_events=None, start_from=0):
         """Process all earthquakes in the CSV file"""
         if not self.client:
@@ -296,19 +652,32 @@ class ProductionSeismicFetcher:
         print("Loading earthquake data...")
         df = pd.read_csv(csv_file)
         df = df.dropna(subset=['latitude', 'longitude'])
+        df = self.prepare_events(df)
         
         if max_events:
             df = df.iloc[start_from:start_from + max_events]
         else:
             df = df.iloc[start_from:]
         
+        # One directory scan instead of an exists() check per event
+        with os.scandir(self.data_dir) as entries:
+            existing = {entry.name for entry in entries if entry.is_dir()}
+        done = df['dir_name'].isin(existing)
+        if done.any():
+            print(f"→ Skipping {done.sum()} events whose directories already exist")
+            df = df[~done]
+        
+        if df.empty:
+            print("Nothing left to process")
+            return
+        
         print(f"\\n{'='*60}")
         print(f"SEISMIC DATA FETCHER - PRODUCTION MODE")
         print(f"{'='*60}")
         print(f"Total earthquakes to process: {len(df)}")
         print(f"Data period: 30 days before and after each event")
         print(f"Max radius: 4000 km per event")
-        print(f"Max stations: 3 per event")
+        print(f"Max stations: {self.MAX_STATIONS} per event")
         print(f"Data will be saved to: {os.path.abspath(self.data_dir)}")
         print(f"{'='*60}")
         
@@ -316,8 +685,9 @@ class ProductionSeismicFetcher:
         failed = 0
         start_time = datetime.now()
         
-        for index, row in df.iterrows():
-            result = self.process_earthquake(row, index - start_from + 1, len(df))
+        # itertuples avoids building a Series for every row
+        for position, row in enumerate(df.itertuples(index=False, name='Earthquake'), start=1):
+            result = self.process_earthquake(row, position, len(df))
             
             if result:
                 successful += 1
@@ -325,19 +695,21 @@ class ProductionSeismicFetcher:
                 failed += 1
             
             # Progress update every 10 events
-            if (index - start_from + 1) % 10 == 0:
+            if position % 10 == 0:
                 elapsed = datetime.now() - start_time
-                rate = (index - start_from + 1) / elapsed.total_seconds() * 3600  # events per hour
+                rate = position / elapsed.total_seconds() * 3600  # events per hour
                 
                 print(f"\\n{'='*60}")
-                print(f"PROGRESS UPDATE - {index - start_from + 1}/{len(df)} events processed")
+                print(f"PROGRESS UPDATE - {position}/{len(df)} events processed")
                 print(f"Successful: {successful} | Failed: {failed}")
                 print(f"Rate: {rate:.1f} events/hour")
                 print(f"Elapsed: {elapsed}")
                 print(f"{'='*60}")
-            
-            # Respectful delay between events
-            time.sleep(5)
+        
+        # Wait for the writer thread to finish the remaining files
+        self.flush_writes()
+        with self._chan_lock:
+            self._chan_cache.sync()
         
         # Final summary
         total_time = datetime.now() - start_time
@@ -365,8 +737,7 @@ class ProductionSeismicFetcher:
             'data_directory': os.path.abspath(self.data_dir)
         }
         
-        with open(os.path.join(self.data_dir, 'processing_summary.json'), 'w') as f:
-            json.dump(summary, f, indent=2)
+        self.write_json(os.path.join(self.data_dir, 'processing_summary.json'), summary)
 
 def main():
     """Main function"""
@@ -421,6 +792,8 @@ def main():
         print("\\nProcessing interrupted by user.")
     except Exception as e:
         print(f"Error: {e}")
+    finally:
+        fetcher.close()
 
 if __name__ == "__main__":
     main()
@@ -6,284 +6,508 @@ Simple seismic data fetcher focusing on proven global stations
 import pandas as pd
 import numpy as np
 import json
+import logging
 import os
+import re
+import shelve
+import threading
 import time
-from datetime import datetime, timedelta
-from obspy import UTCDateTime
-from obspy.clients.fdsn import Client
-from obspy.clients.fdsn.header import FDSNException
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property, lru_cache
+from math import radians, cos, sin, asin, sqrt
+from datetime import datetime
+from obspy import Stream, UTCDateTime
+from obspy.clients.fdsn.header import FDSNNoDataException
 import warnings
 warnings.filterwarnings('ignore')
 
+try:
+    from fdsn_session import SessionClient
+except ImportError:
+    from backup.fdsn_session import SessionClient
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Progress goes through logging with deferred %-formatting: main() shows it
+# at INFO, library callers can raise the level to WARNING for mass runs
+logger = logging.getLogger(__name__)
+
+# Channel bands to request, in order of preference
+CHANNEL_PRIORITIES = ('BH?', 'HH?', 'LH?')
+
+# Characters dropped from titles when building directory names; \w keeps
+# the same (Unicode) letters and digits as str.isalnum() plus '_'
+_SAFE_TITLE_RE = re.compile(r'[^\w \-]+')
+
+# Seconds a "no data" answer is trusted before the window is requested again
+# (archives are backfilled, so misses are not permanent)
+AVAILABILITY_TTL = 30 * 86400
+
+# Well-known, reliable global stations, kept in a CSV catalog next to this
+# script so the list can grow without code changes
+STATION_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'simple_stations.csv')
+
+def load_stations(station_file=STATION_FILE):
+    """
+    Read the station catalog into a structure-of-arrays dict: contiguous
+    coordinates for the distance math plus the text fields
+    """
+    catalog = pd.read_csv(
+        station_file,
+        usecols=['network', 'station', 'latitude', 'longitude', 'name'],
+        dtype={'network': str, 'station': str, 'name': str,
+               'latitude': np.float64, 'longitude': np.float64},
+        keep_default_na=False
+    )
+    return {
+        'net': catalog['network'].to_numpy(dtype='U'),
+        'sta': catalog['station'].to_numpy(dtype='U'),
+        'name': catalog['name'].to_numpy(dtype=object),
+        'lat': catalog['latitude'].to_numpy(dtype=np.float64),
+        'lon': catalog['longitude'].to_numpy(dtype=np.float64),
+    }
+
+# Loaded once at import
+_STATIONS = load_stations()
+_STA_LAT = np.radians(_STATIONS['lat'])
+_STA_LON = np.radians(_STATIONS['lon'])
+# Station latitudes never change, so their cosine is computed only once
+_STA_COS = np.cos(_STA_LAT)
+
+@lru_cache(maxsize=1024)
+def _prepare_query(latitude, longitude):
+    """Query-point terms of the haversine: (lat in radians, its cosine, lon in radians)"""
+    lat_r = radians(latitude)
+    return lat_r, cos(lat_r), radians(longitude)
+
+def _distance_to(query, latitude, longitude):
+    """Distance in km from a _prepare_query result to one point in degrees"""
+    lat1, cos_lat1, lon1 = query
+    lat2 = radians(latitude)
+    dlat = lat2 - lat1
+    dlon = radians(longitude) - lon1
+    a = sin(dlat/2)**2 + cos_lat1 * cos(lat2) * sin(dlon/2)**2
+    return 2 * 6371 * asin(sqrt(a))
+
+@lru_cache(maxsize=8192)
+def _haversine(lat1, lon1, lat2, lon2):
+    """Distance in km between two points given in degrees (memoized)"""
+    return _distance_to(_prepare_query(lat1, lon1), lat2, lon2)
+
+def haversine_all(lat1, lon1, idx=None, out=None):
+    """
+    Distance in km from (lat1, lon1), given in radians, to every station
+    (or only the stations at the indices idx). All steps run in place, so
+    one call allocates at most two arrays besides the idx selection.
+    """
+    sta_lat, sta_lon, sta_cos = _STA_LAT, _STA_LON, _STA_COS
+    if idx is not None:
+        sta_lat, sta_lon, sta_cos = sta_lat[idx], sta_lon[idx], sta_cos[idx]
+    if out is None:
+        out = np.empty_like(sta_lat)
+    
+    # cos(lat1) * cos(lat2) * sin(dlon/2)**2
+    term = np.subtract(sta_lon, lon1)
+    term *= 0.5
+    np.sin(term, out=term)
+    np.square(term, out=term)
+    term *= sta_cos
+    term *= cos(lat1)
+    
+    # sin(dlat/2)**2 + term, then 2 * R * asin(sqrt(a))
+    np.subtract(sta_lat, lat1, out=out)
+    out *= 0.5
+    np.sin(out, out=out)
+    np.square(out, out=out)
+    out += term
+    np.sqrt(out, out=out)
+    np.arcsin(out, out=out)
+    out *= 2 * 6371
+    return out
+
+def _bounding_box(latitude, longitude, max_radius_km):
+    """
+    Indices of the stations inside the lat/lon box that encloses the search
+    circle; a cheap superset of the stations within max_radius_km
+    """
+    angle = max_radius_km / 6371
+    dlat = np.degrees(angle)
+    mask = np.abs(_STATIONS['lat'] - latitude) <= dlat + 1e-9
+    
+    # The longitude bound only holds while the circle does not reach a pole
+    if abs(latitude) + dlat < 90:
+        dlon = np.degrees(asin(sin(angle) / cos(radians(latitude))))
+        wrapped = np.abs((_STATIONS['lon'] - longitude + 180) % 360 - 180)
+        mask &= wrapped <= dlon + 1e-9
+    return np.flatnonzero(mask)
+
+@lru_cache(maxsize=4096)
+def _nearest_stations(latitude, longitude, max_radius_km):
+    """
+    Indices of the stations within max_radius_km, nearest first, and their
+    distances. Memoized: the station list is fixed, and the same event
+    location is often queried more than once.
+    """
+    # Drop far stations with plain comparisons before doing any trig
+    candidates = _bounding_box(latitude, longitude, max_radius_km)
+    
+    # Haversine distance to the remaining stations in one vectorized pass
+    distances = haversine_all(radians(latitude), radians(longitude), idx=candidates)
+    
+    # Filter by radius and sort by distance
+    within = np.flatnonzero(distances <= max_radius_km)
+    within = within[np.argsort(distances[within], kind='stable')]
+    idx = candidates[within]
+    idx.flags.writeable = False
+    return idx, tuple(distances[within].tolist())
+
+def _as_utc(t):
+    """t as a UTCDateTime, without re-parsing one that already is"""
+    return t if isinstance(t, UTCDateTime) else UTCDateTime(t)
+
 class SimpleSeismicFetcher:
     def __init__(self, data_dir='seismic_station_data'):
         self.data_dir = data_dir
         
-        # Initialize only IRIS client (most reliable)
+        # Create main data directory
+        os.makedirs(self.data_dir, exist_ok=True)
+        
+        # Persistent record of station windows that returned no data
+        self._avail_cache = shelve.open(os.path.join(self.data_dir, '.availability.db'))
+        self._avail_lock = threading.Lock()
+    
+    @cached_property
+    def client(self):
+        """
+        IRIS client (most reliable), created on first use: the FDSN service
+        discovery is a network round trip that station lookups never need
+        """
         try:
-            self.client = Client('IRIS')
-            print("✓ IRIS client initialized successfully")
+            # Up to 3 retries, sleeping about 0.5 s, 1 s, 2 s (capped at 8 s) or
+            # as long as a Retry-After header asks for
+            client = SessionClient('IRIS', timeout=120, pool_size=8, backoff_factor=0.5, backoff_max=8)
+            logger.info("✓ IRIS client initialized successfully")
+            return client
         except Exception as e:
-            print(f"✗ Failed to initialize IRIS client: {e}")
-            self.client = None
-        
-        # Create main data directory
-        if not os.path.exists(self.data_dir):
-            os.makedirs(self.data_dir)
+            logger.error("✗ Failed to initialize IRIS client: %s", e)
+            return None
+    
+    def _ensure_client(self):
+        """Create the IRIS client now, before worker threads share it"""
+        return self.client
     
     def get_global_stations(self, latitude, longitude, max_radius_km=1000):
         """
         Get reliable global seismic stations
         """
-        # Well-known, reliable global stations
-        global_stations = [
-            # Global Seismographic Network (GSN) - most reliable
-            {'network': 'IU', 'station': 'ANMO', 'latitude': 34.9459, 'longitude': -106.4572, 'name': 'Albuquerque, NM'},
-            {'network': 'IU', 'station': 'HRV', 'latitude': 42.5064, 'longitude': -71.5583, 'name': 'Harvard, MA'},
-            {'network': 'IU', 'station': 'COLA', 'latitude': 64.8738, 'longitude': -147.8616, 'name': 'College, AK'},
-            {'network': 'IU', 'station': 'CCM', 'latitude': 38.0557, 'longitude': -91.2446, 'name': 'Cathedral Cave, MO'},
-            {'network': 'IU', 'station': 'FUNA', 'latitude': -8.5259, 'longitude': 179.1966, 'name': 'Funafuti, Tuvalu'},
-            {'network': 'IU', 'station': 'GUMO', 'latitude': 13.5893, 'longitude': 144.8684, 'name': 'Guam, Mariana Is'},
-            {'network': 'IU', 'station': 'MAJO', 'latitude': 36.5457, 'longitude': 138.2041, 'name': 'Matsushiro, Japan'},
-            {'network': 'IU', 'station': 'PAB', 'latitude': 39.5446, 'longitude': 4.3499, 'name': 'San Pablo, Spain'},
-            {'network': 'IU', 'station': 'PMSA', 'latitude': -64.7744, 'longitude': -64.0489, 'name': 'Palmer Station, Antarctica'},
-            {'network': 'IU', 'station': 'QSPA', 'latitude': -89.9289, 'longitude': 144.4382, 'name': 'South Pole, Antarctica'},
-            {'network': 'IU', 'station': 'SSPA', 'latitude': -40.3084, 'longitude': -70.8601, 'name': 'San Martin, Argentina'},
-            {'network': 'IU', 'station': 'TATO', 'latitude': 24.9735, 'longitude': 121.4971, 'name': 'Taipei, Taiwan'},
-            {'network': 'IU', 'station': 'KONO', 'latitude': 59.6491, 'longitude': 9.5982, 'name': 'Kongsberg, Norway'},
-            {'network': 'IU', 'station': 'KEV', 'latitude': 69.7565, 'longitude': 27.0035, 'name': 'Kevo, Finland'},
-            {'network': 'IU', 'station': 'KIEV', 'latitude': 50.7012, 'longitude': 29.2242, 'name': 'Kiev, Ukraine'},
-            {'network': 'IU', 'station': 'MAKZ', 'latitude': 46.8080, 'longitude': 82.1283, 'name': 'Makanchi, Kazakhstan'},
-            {'network': 'IU', 'station': 'TEIG', 'latitude': 20.2263, 'longitude': 92.7936, 'name': 'Teigaga, Myanmar'},
-            {'network': 'IU', 'station': 'ULN', 'latitude': 47.8651, 'longitude': 107.0532, 'name': 'Ulaanbaatar, Mongolia'},
-            
-            # European stations
-            {'network': 'GE', 'station': 'SNAA', 'latitude': 67.0180, 'longitude': -2.0199, 'name': 'Snartemo, Norway'},
-            {'network': 'GE', 'station': 'WLF', 'latitude': 49.6555, 'longitude': 6.1508, 'name': 'Walferdange, Luxembourg'},
-            {'network': 'GE', 'station': 'SUMG', 'latitude': -0.5527, 'longitude': 100.2381, 'name': 'Sumatra, Indonesia'},
-            {'network': 'GE', 'station': 'APE', 'latitude': 40.8204, 'longitude': 14.4297, 'name': 'Ape, Italy'},
-            
-            # Additional reliable stations
-            {'network': 'US', 'station': 'WMOK', 'latitude': 34.7367, 'longitude': -98.7707, 'name': 'Wichita Mountains, OK'},
-            {'network': 'CI', 'station': 'PAS', 'latitude': 34.1484, 'longitude': -118.1717, 'name': 'Pasadena, CA'},
-            {'network': 'BK', 'station': 'BRK', 'latitude': 37.8735, 'longitude': -122.2609, 'name': 'Berkeley, CA'},
-            
-            # Middle East and Turkey region
-            {'network': 'TU', 'station': 'ISK', 'latitude': 41.0618, 'longitude': 29.0608, 'name': 'Istanbul, Turkey'},
-            {'network': 'KO', 'station': 'KONS', 'latitude': 39.8467, 'longitude': 32.8627, 'name': 'Ankara, Turkey'},
-            {'network': 'HL', 'station': 'JER', 'latitude': 31.7730, 'longitude': 35.2045, 'name': 'Jerusalem, Israel'},
-            {'network': 'II', 'station': 'ANTO', 'latitude': 39.8683, 'longitude': 32.7934, 'name': 'Ankara, Turkey'},
-            {'network': 'II', 'station': 'NIL', 'latitude': 33.6506, 'longitude': 73.2686, 'name': 'Nilore, Pakistan'},
-            
-            # Australian and Pacific
-            {'network': 'AU', 'station': 'ARMA', 'latitude': -30.6267, 'longitude': 151.9501, 'name': 'Armidale, Australia'},
-            {'network': 'AU', 'station': 'EIDS', 'latitude': -26.3912, 'longitude': 116.7975, 'name': 'Emu Heights, Australia'},
-        ]
+        idx, distances = _nearest_stations(latitude, longitude, max_radius_km)
         
-        # Calculate distances and filter
-        stations = []
-        for station in global_stations:
-            distance = self.calculate_distance(
-                latitude, longitude,
-                station['latitude'], station['longitude']
+        # Fresh dicts on every call, so callers may modify them
+        return [
+            {
+                'network': network,
+                'station': station,
+                'latitude': lat,
+                'longitude': lon,
+                'name': name,
+                'distance_km': distance
+            }
+            for network, station, lat, lon, name, distance in zip(
+                _STATIONS['net'][idx].tolist(),
+                _STATIONS['sta'][idx].tolist(),
+                _STATIONS['lat'][idx].tolist(),
+                _STATIONS['lon'][idx].tolist(),
+                _STATIONS['name'][idx].tolist(),
+                distances
             )
-            
-            if distance <= max_radius_km:
-                station['distance_km'] = distance
-                stations.append(station)
-        
-        # Sort by distance
-        stations.sort(key=lambda x: x['distance_km'])
-        return stations
+        ]
     
     def calculate_distance(self, lat1, lon1, lat2, lon2):
         """Calculate distance using Haversine formula"""
-        from math import radians, cos, sin, asin, sqrt
-        
-        lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-        a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-        c = 2 * asin(sqrt(a))
-        r = 6371  # Earth radius in kilometers
-        
-        return c * r
+        return _haversine(lat1, lon1, lat2, lon2)
     
     def get_waveforms(self, network, station, start_time, end_time):
         """
         Get seismic waveforms for a station
         """
+        return self.get_waveforms_bulk(network, station, [(start_time, end_time)])[0]
+    
+    def get_waveforms_bulk(self, network, station, windows):
+        """
+        Get several time windows for a station in one bulk request.
+        Returns a (waveforms, message) pair per window, in order.
+        """
         if not self.client:
-            return None, "No client available"
+            return [(None, "No client available")] * len(windows)
         
+        return self._fetch_windows([(network, station, start, end) for start, end in windows])
+    
+    def _fetch_windows(self, jobs):
+        """
+        Fetch (network, station, start, end) windows, for any mix of stations,
+        in one bulk request. Returns a (waveforms, message) pair per job, in order.
+        """
         # Convert to UTCDateTime
-        starttime = UTCDateTime(start_time)
-        endtime = UTCDateTime(end_time)
-        
-        # Try different channel priorities
-        channel_priorities = [
-            ['BH*'],  # Broadband high-gain
-            ['HH*'],  # High broadband  
-            ['LH*'],  # Long period
-            ['BH1', 'BH2', 'BHZ'],  # Individual components
-            ['HH1', 'HH2', 'HHZ'],
+        jobs = [(network, station, _as_utc(start), _as_utc(end)) for network, station, start, end in jobs]
+        
+        # Windows recently found to have no data are not requested again
+        keys = [self._availability_key(network, station, starttime, endtime) for network, station, starttime, endtime in jobs]
+        results = [(None, "No data found (cached)")] * len(jobs)
+        pending = [i for i, key in enumerate(keys) if not self._known_unavailable(key)]
+        if not pending:
+            return results
+        
+        # Every preferred band and window in a single request
+        bulk = [
+            (network, station, "*", channel, starttime, endtime)
+            for network, station, starttime, endtime in (jobs[i] for i in pending)
+            for channel in CHANNEL_PRIORITIES
         ]
         
-        for channels in channel_priorities:
-            for channel in channels:
+        failed = set()
+        if logger.isEnabledFor(logging.INFO):
+            names = sorted({f"{jobs[i][0]}.{jobs[i][1]}" for i in pending})
+            logger.info("        Requesting %s.%s...", ','.join(names), ','.join(CHANNEL_PRIORITIES))
+        try:
+            waveforms = self.client.get_waveforms_bulk(bulk)
+        except FDSNNoDataException:
+            waveforms = None
+        except Exception as e:
+            # Fall back once to a plain request per window
+            logger.warning("        Bulk request failed (%s), retrying per window", e)
+            waveforms = Stream()
+            for i in pending:
+                network, station, starttime, endtime = jobs[i]
                 try:
-                    print(f"        Trying {network}.{station}.{channel}...")
-                    
-                    waveforms = self.client.get_waveforms(
+                    waveforms += self.client.get_waveforms(
                         network=network,
                         station=station,
                         location="*",
-                        channel=channel,
+                        channel=','.join(CHANNEL_PRIORITIES),
                         starttime=starttime,
                         endtime=endtime
                     )
-                    
-                    if waveforms and len(waveforms) > 0:
-                        print(f"        ✓ Got {len(waveforms)} traces")
-                        return waveforms, "IRIS"
-                        
-                except FDSNException as e:
-                    if "No data available" in str(e):
-                        continue
-                    else:
-                        print(f"        FDSN error: {e}")
+                except FDSNNoDataException:
+                    continue
                 except Exception as e:
-                    print(f"        Error: {e}")
-                
-                time.sleep(0.3)  # Small delay
+                    logger.warning("        Error: %s", e)
+                    failed.add(i)
         
-        return None, "No data found"
+        for i in pending:
+            network, station, starttime, endtime = jobs[i]
+            results[i] = (None, "No data found")
+            
+            # Keep the most preferred band that has data in this window
+            if waveforms:
+                in_window = waveforms.select(network=network, station=station)
+                in_window = in_window.slice(starttime, endtime, nearest_sample=False)
+                for channel in CHANNEL_PRIORITIES:
+                    selected = in_window.select(channel=channel)
+                    if len(selected) > 0:
+                        logger.info("        ✓ Got %d traces", len(selected))
+                        results[i] = (selected, "IRIS")
+                        break
+            
+            # Only a definite "no data" answer is remembered, not an error
+            if results[i][0] is None and i not in failed:
+                self._mark_unavailable(keys[i])
+        return results
+    
+    def _availability_key(self, network, station, starttime, endtime):
+        """Availability cache key: station, channel bands and the exact window"""
+        return f"{network}.{station}.{','.join(CHANNEL_PRIORITIES)}.{starttime.ns}-{endtime.ns}"
+    
+    def _known_unavailable(self, key):
+        """True if the key was recorded as having no data within AVAILABILITY_TTL"""
+        with self._avail_lock:
+            entry = self._avail_cache.get(key)
+        return entry is not None and time.time() - entry['checked'] < AVAILABILITY_TTL
+    
+    def _mark_unavailable(self, key):
+        """Record that a window returned no data"""
+        with self._avail_lock:
+            self._avail_cache[key] = {'available': False, 'checked': time.time()}
     
     def save_waveforms(self, waveforms, filepath):
-        """Save waveforms to file"""
+        """Save waveforms to file (STEIM2-compressed when the samples are integer counts)"""
         try:
-            waveforms.write(filepath, format='MSEED')
+            for tr in waveforms:
+                if tr.data.dtype != np.int32 and self._fits_int32(tr.data):
+                    tr.data = tr.data.astype(np.int32)
+            
+            if all(tr.data.dtype == np.int32 for tr in waveforms):
+                try:
+                    waveforms.write(filepath, format='MSEED', encoding='STEIM2', reclen=4096)
+                except Exception:
+                    # Sample differences too large for STEIM2; store them uncompressed
+                    waveforms.write(filepath, format='MSEED', encoding='INT32', reclen=4096)
+            else:
+                waveforms.write(filepath, format='MSEED')
             return True
         except Exception as e:
-            print(f"Error saving waveforms: {e}")
+            logger.error("Error saving waveforms: %s", e)
             return False
     
-    def process_single_earthquake(self, title, magnitude, event_time, latitude, longitude, location):
+    def _process_station(self, i, station, windows, prefetched=None):
         """
-        Process a single earthquake and fetch seismic data
+        Fetch and save every window for one station; with prefetched, a
+        {(network, station, start_ns, end_ns): (waveforms, msg)} dict from a
+        batch request, the windows are taken from it instead.
+        Returns (station_info, successful retrievals counted in halves).
         """
-        print(f"\n{'='*60}")
-        print(f"Processing: {title}")
-        print(f"Location: {location}")
-        print(f"Time: {event_time}")
-        print(f"Magnitude: {magnitude}")
-        print(f"{'='*60}")
+        network = station['network']
+        station_code = station['station']
+        distance = station['distance_km']
+        name = station['name']
+        
+        logger.info("\n--- Station %d: %s.%s (%s) ---", i, network, station_code, name)
+        logger.info("Distance: %.1f km", distance)
+        
+        station_info = {
+            'network': network,
+            'station': station_code,
+            'name': name,
+            'latitude': station['latitude'],
+            'longitude': station['longitude'],
+            'distance_km': distance,
+            'data_retrieved': {period: False for period, _, _, _ in windows}
+        }
+        retrieved = 0
+        
+        # Files saved by an earlier, interrupted run are kept as they are
+        missing = []
+        for period, start, end, period_dir in windows:
+            filepath = os.path.join(period_dir, f'{network}_{station_code}_{period}.mseed')
+            if self._saved_size(filepath) > 0:
+                logger.info("    → %s.%s: %s-event data already saved", network, station_code, period)
+                station_info['data_retrieved'][period] = True
+                retrieved += 0.5
+            else:
+                missing.append((period, start, end, filepath))
+        if not missing:
+            return station_info, retrieved
+        
+        if prefetched is not None:
+            results = [
+                prefetched.get(self._window_key(network, station_code, start, end), (None, "No data found"))
+                for _, start, end, _ in missing
+            ]
+        else:
+            # Fetch the missing before- and after-event data in one request
+            logger.info("  %s.%s: fetching %s-event data...", network, station_code, ' and '.join(m[0] for m in missing))
+            results = self.get_waveforms_bulk(
+                network, station_code,
+                [(start, end) for _, start, end, _ in missing]
+            )
+        
+        for (period, _, _, filepath), (waveforms, msg) in zip(missing, results):
+            if waveforms:
+                if self.save_waveforms(waveforms, filepath):
+                    station_info['data_retrieved'][period] = True
+                    file_size = self._saved_size(filepath) / (1024*1024)
+                    logger.info("    ✓ %s.%s: saved %s-event data (%.1f MB)", network, station_code, period, file_size)
+                    retrieved += 0.5
+            else:
+                logger.info("    ✗ %s.%s: no %s-event data: %s", network, station_code, period, msg)
+        
+        return station_info, retrieved
+    
+    def write_json(self, filepath, data):
+        """Write data as indented JSON, using orjson when it is installed"""
+        if orjson is not None:
+            with open(filepath, 'wb') as f:
+                f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+        else:
+            with open(filepath, 'w') as f:
+                json.dump(data, f, indent=2)
+    
+    @staticmethod
+    def _saved_size(filepath):
+        """Size of a saved file in bytes, 0 if it does not exist (one stat call)"""
+        try:
+            return os.stat(filepath).st_size
+        except FileNotFoundError:
+            return 0
+    
+    @staticmethod
+    def _fits_int32(data):
+        """True if every sample is a whole number within the int32 range"""
+        if data.size == 0:
+            return False
+        if np.issubdtype(data.dtype, np.floating):
+            if not np.all(np.mod(data, 1) == 0):
+                return False
+        elif not np.issubdtype(data.dtype, np.integer):
+            return False
+        return data.min() >= np.iinfo(np.int32).min and data.max() <= np.iinfo(np.int32).max
+    
+    @staticmethod
+    def _window_key(network, station, start, end):
+        """Hashable key for one station window (UTCDateTime itself is not hashable)"""
+        return network, station, _as_utc(start).ns, _as_utc(end).ns
+    
+    def _plan_event(self, title, magnitude, event_time, latitude, longitude, location):
+        """
+        Create the event directories and pick its stations.
+        Returns the event plan, or None if no station is in range.
+        """
+        logger.info("\n%s", '=' * 60)
+        logger.info("Processing: %s", title)
+        logger.info("Location: %s", location)
+        logger.info("Time: %s", event_time)
+        logger.info("Magnitude: %s", magnitude)
+        logger.info("%s", '=' * 60)
         
         # Create event directory
-        safe_title = "".join(c for c in title if c.isalnum() or c in (' ', '-', '_')).rstrip()
-        safe_title = safe_title.replace(' ', '_')[:80]
+        safe_title = _SAFE_TITLE_RE.sub('', title).rstrip().replace(' ', '_')[:80]
         
         event_dir = os.path.join(
             self.data_dir, 
             f"{event_time.strftime('%Y%m%d_%H%M')}_M{magnitude}_{safe_title}"
         )
         
-        if os.path.exists(event_dir):
-            print(f"Directory already exists: {event_dir}")
-            return event_dir
-        
-        os.makedirs(event_dir, exist_ok=True)
-        
-        # Create before/after directories
+        # Create event and before/after directories; an existing directory
+        # is resumed, and files already saved in it are skipped
         before_dir = os.path.join(event_dir, 'before_event')
         after_dir = os.path.join(event_dir, 'after_event')
-        os.makedirs(before_dir, exist_ok=True)
-        os.makedirs(after_dir, exist_ok=True)
+        try:
+            os.mkdir(event_dir)
+        except FileExistsError:
+            logger.info("Directory already exists, resuming: %s", event_dir)
+            os.makedirs(before_dir, exist_ok=True)
+            os.makedirs(after_dir, exist_ok=True)
+        else:
+            os.mkdir(before_dir)
+            os.mkdir(after_dir)
         
-        # Define time periods (30 days before and after)
-        before_start = event_time - timedelta(days=30)
-        before_end = event_time - timedelta(hours=1)
-        after_start = event_time + timedelta(hours=1)
-        after_end = event_time + timedelta(days=30)
+        # Define time periods (30 days before and after), converted to
+        # UTCDateTime once here and passed as-is to the requests
+        event_utc = UTCDateTime(event_time)
+        before_start = event_utc - 30 * 86400
+        before_end = event_utc - 3600
+        after_start = event_utc + 3600
+        after_end = event_utc + 30 * 86400
         
-        print(f"\nTime periods:")
-        print(f"  Before: {before_start} to {before_end}")
-        print(f"  After:  {after_start} to {after_end}")
+        logger.info("\nTime periods:")
+        logger.info("  Before: %s to %s", before_start.datetime, before_end.datetime)
+        logger.info("  After:  %s to %s", after_start.datetime, after_end.datetime)
         
         # Find nearest stations
-        print(f"\nFinding nearest stations...")
+        logger.info("\nFinding nearest stations...")
         stations = self.get_global_stations(latitude, longitude, max_radius_km=2000)
         
         if not stations:
-            print("No stations found within 2000 km!")
+            logger.warning("No stations found within 2000 km!")
             return None
         
-        print(f"Found {len(stations)} stations within range:")
+        logger.info("Found %d stations within range:", len(stations))
         for i, station in enumerate(stations[:5], 1):  # Show top 5
-            print(f"  {i}. {station['network']}.{station['station']} - {station['name']} ({station['distance_km']:.0f} km)")
-        
-        # Process top 3 stations
-        station_results = []
-        successful_stations = 0
-        
-        for i, station in enumerate(stations[:3], 1):
-            network = station['network']
-            station_code = station['station']
-            distance = station['distance_km']
-            name = station['name']
-            
-            print(f"\n--- Station {i}: {network}.{station_code} ({name}) ---")
-            print(f"Distance: {distance:.1f} km")
-            
-            station_info = {
-                'network': network,
-                'station': station_code,
-                'name': name,
-                'latitude': station['latitude'],
-                'longitude': station['longitude'],
-                'distance_km': distance,
-                'data_retrieved': {'before': False, 'after': False}
-            }
-            
-            # Fetch before-event data
-            print(f"  Fetching before-event data...")
-            before_waveforms, before_msg = self.get_waveforms(
-                network, station_code, before_start, before_end
-            )
-            
-            if before_waveforms:
-                before_file = os.path.join(before_dir, f'{network}_{station_code}_before.mseed')
-                if self.save_waveforms(before_waveforms, before_file):
-                    station_info['data_retrieved']['before'] = True
-                    file_size = os.path.getsize(before_file) / (1024*1024)
-                    print(f"    ✓ Saved before-event data ({file_size:.1f} MB)")
-                    successful_stations += 0.5
-            else:
-                print(f"    ✗ No before-event data: {before_msg}")
-            
-            time.sleep(2)  # Respectful delay
-            
-            # Fetch after-event data
-            print(f"  Fetching after-event data...")
-            after_waveforms, after_msg = self.get_waveforms(
-                network, station_code, after_start, after_end
-            )
-            
-            if after_waveforms:
-                after_file = os.path.join(after_dir, f'{network}_{station_code}_after.mseed')
-                if self.save_waveforms(after_waveforms, after_file):
-                    station_info['data_retrieved']['after'] = True
-                    file_size = os.path.getsize(after_file) / (1024*1024)
-                    print(f"    ✓ Saved after-event data ({file_size:.1f} MB)")
-                    successful_stations += 0.5
-            else:
-                print(f"    ✗ No after-event data: {after_msg}")
-            
-            station_results.append(station_info)
-            time.sleep(3)  # Longer delay between stations
+            logger.info("  %d. %s.%s - %s (%.0f km)", i, station['network'], station['station'], station['name'], station['distance_km'])
         
-        # Save metadata
-        metadata = {
+        return {
             'event_info': {
                 'title': title,
                 'magnitude': magnitude,
@@ -292,35 +516,130 @@ class SimpleSeismicFetcher:
                 'longitude': longitude,
                 'location': location
             },
+            'event_dir': event_dir,
+            'stations': stations[:3],
+            'windows': [
+                ('before', before_start, before_end, before_dir),
+                ('after', after_start, after_end, after_dir)
+            ]
+        }
+    
+    def _finish_event(self, plan, outcomes):
+        """Write metadata.json for a processed event and return its directory"""
+        station_results = [station_info for station_info, _ in outcomes]
+        successful_stations = sum(retrieved for _, retrieved in outcomes)
+        with self._avail_lock:
+            self._avail_cache.sync()
+        
+        # Save metadata
+        metadata = {
+            'event_info': plan['event_info'],
             'stations': station_results,
             'data_periods': {
-                'before': {
-                    'start': before_start.isoformat(),
-                    'end': before_end.isoformat(),
-                    'duration_days': 30
-                },
-                'after': {
-                    'start': after_start.isoformat(),
-                    'end': after_end.isoformat(),
+                period: {
+                    'start': start.datetime.isoformat(),
+                    'end': end.datetime.isoformat(),
                     'duration_days': 30
                 }
+                for period, start, end, _ in plan['windows']
             },
             'processing_time': datetime.now().isoformat(),
             'successful_retrievals': successful_stations,
             'status': 'completed'
         }
         
-        with open(os.path.join(event_dir, 'metadata.json'), 'w') as f:
-            json.dump(metadata, f, indent=2)
+        event_dir = plan['event_dir']
+        self.write_json(os.path.join(event_dir, 'metadata.json'), metadata)
         
-        print(f"\n✓ Processing complete!")
-        print(f"  Successful data retrievals: {successful_stations}/6")
-        print(f"  Data saved to: {event_dir}")
+        logger.info("\n✓ Processing complete!")
+        logger.info("  Successful data retrievals: %s/6", successful_stations)
+        logger.info("  Data saved to: %s", event_dir)
         
         return event_dir
+    
+    def process_single_earthquake(self, title, magnitude, event_time, latitude, longitude, location):
+        """
+        Process a single earthquake and fetch seismic data
+        """
+        plan = self._plan_event(title, magnitude, event_time, latitude, longitude, location)
+        if plan is None:
+            return None
+        
+        self._ensure_client()
+        
+        # Process top 3 stations in parallel; the requests are independent
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = [
+                executor.submit(self._process_station, i, station, plan['windows'])
+                for i, station in enumerate(plan['stations'], 1)
+            ]
+            outcomes = [future.result() for future in futures]
+        
+        return self._finish_event(plan, outcomes)
+    
+    def batch_process_earthquakes(self, events, max_bulk_lines=50):
+        """
+        Process many earthquakes with as few requests as possible: the missing
+        windows of every event are fetched together in bulk requests of at most
+        max_bulk_lines lines, then split back per event and saved.
+        
+        Args:
+            events: list of dicts with title, magnitude, datetime, latitude,
+                longitude and location (as in main())
+            max_bulk_lines: upper bound on lines per bulk request
+        
+        Returns:
+            List of event directories (None for events without stations)
+        """
+        if not self.client:
+            logger.error("Cannot proceed without IRIS client")
+            return []
+        
+        plans = [
+            self._plan_event(event['title'], event['magnitude'], event['datetime'],
+                             event['latitude'], event['longitude'], event['location'])
+            for event in events
+        ]
+        
+        # Every window not yet on disk, once per distinct station window
+        jobs = {}
+        for plan in plans:
+            if plan is None:
+                continue
+            for station in plan['stations']:
+                network, station_code = station['network'], station['station']
+                for period, start, end, period_dir in plan['windows']:
+                    filepath = os.path.join(period_dir, f'{network}_{station_code}_{period}.mseed')
+                    if self._saved_size(filepath) == 0:
+                        key = self._window_key(network, station_code, start, end)
+                        jobs[key] = (network, station_code, start, end)
+        
+        # Bulk requests of at most max_bulk_lines lines (one line per band)
+        jobs = list(jobs.items())
+        per_request = max(1, max_bulk_lines // len(CHANNEL_PRIORITIES))
+        prefetched = {}
+        logger.info("\nFetching %d station windows in %d bulk requests...", len(jobs), -(-len(jobs) // per_request))
+        for first in range(0, len(jobs), per_request):
+            chunk = jobs[first:first + per_request]
+            results = self._fetch_windows([job for _, job in chunk])
+            prefetched.update(zip((key for key, _ in chunk), results))
+        
+        # Save each event's windows from the combined results
+        event_dirs = []
+        for plan in plans:
+            if plan is None:
+                event_dirs.append(None)
+                continue
+            outcomes = [
+                self._process_station(i, station, plan['windows'], prefetched)
+                for i, station in enumerate(plan['stations'], 1)
+            ]
+            event_dirs.append(self._finish_event(plan, outcomes))
+        return event_dirs
 
 def main():
     """Test with a single recent earthquake"""
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
     fetcher = SimpleSeismicFetcher()
     
     if not fetcher.client:
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Test script for the fetcher's per data center rate limiter
+"""
+
+import sys
+import threading
+import time
+sys.path.append('.')
+
+from backup.fetch_seismic_data import RateLimiter
+
+def test_fractional_rate_acquires():
+    """A limiter below one request per second (a worker's share) still hands out tokens"""
+    
+    limiter = RateLimiter(5 / 8)
+    acquired = []
+    
+    def take_two():
+        for _ in range(2):
+            limiter.acquire()
+            acquired.append(time.monotonic())
+    
+    start = time.monotonic()
+    worker = threading.Thread(target=take_two, daemon=True)
+    worker.start()
+    worker.join(timeout=5)
+    
+    assert len(acquired) == 2, f"only {len(acquired)} of 2 tokens acquired within 5 s"
+    # The first token is available at once, the second after about 1 / rate seconds
+    assert acquired[0] - start < 0.5
+    assert 1.0 < acquired[1] - start < 2.5
+    print("RateLimiter(5/8): 2 tokens acquired, "
+          f"second after {acquired[1] - start:.2f} s")
+
+if __name__ == "__main__":
+    test_fractional_rate_acquires()
@@ -3,12 +3,15 @@
 Test script for seismic station finder
 """
 
+import logging
 import sys
 import os
 sys.path.append('.')
 
 from backup.fetch_seismic_data import SeismicDataFetcher
 
+logger = logging.getLogger(__name__)
+
 def test_station_finder():
     """Test the station finding functionality"""
     
@@ -23,23 +26,24 @@ def test_station_finder():
         (-33.8688, 151.2093, "Sydney, Australia")
     ]
     
-    print("=== Testing Station Finder ===\n")
+    logger.info("=== Testing Station Finder ===\n")
     
     for lat, lon, location in test_locations:
-        print(f"Testing location: {location} ({lat}, {lon})")
-        print("-" * 50)
+        logger.info("Testing location: %s (%s, %s)", location, lat, lon)
+        logger.info("-" * 50)
         
         stations = fetcher.get_nearest_stations(lat, lon, max_radius_km=1000, max_stations=5)
         
         if stations:
-            print(f"Found {len(stations)} stations:")
+            logger.info("Found %d stations:", len(stations))
             for i, station in enumerate(stations, 1):
-                print(f"  {i}. {station['network']}.{station['station']} - {station['distance_km']:.1f} km")
-                print(f"      Location: ({station['latitude']:.3f}, {station['longitude']:.3f})")
+                logger.info("  %d. %s.%s - %.1f km", i, station['network'], station['station'], station['distance_km'])
+                logger.info("      Location: (%.3f, %.3f)", station['latitude'], station['longitude'])
         else:
-            print("No stations found!")
+            logger.warning("No stations found!")
         
-        print("\n")
+        logger.info("\n")
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
     test_station_finder()
@@ -18,7 +18,7 @@ def test_waveform_fetching():
     # Initialize fetcher
     fetcher = SeismicDataFetcher()
     
-    if not fetcher.clients:
+    if not fetcher.warm_clients():
         print("No FDSN clients available. Please check ObsPy installation.")
         return
     
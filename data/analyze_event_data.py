@@ -6,10 +6,10 @@ This script analyzes the extracted data to provide insights about foreshocks and
 
 import pandas as pd
 import numpy as np
+import argparse
+import heapq
 import json
 import os
-import matplotlib.pyplot as plt
-import seaborn as sns
 from datetime import datetime, timedelta
 
 def analyze_event_data(event_analysis_dir):
@@ -31,19 +31,25 @@ def analyze_event_data(event_analysis_dir):
     print(f"Processing Date: {summary['processing_date']}")
     print(f"Total Major Events Processed: {summary['total_events_processed']}")
     
-    # Analyze before/after patterns
-    events_with_before = [e for e in summary['events'] if e['before_count'] > 0]
-    events_with_after = [e for e in summary['events'] if e['after_count'] > 0]
-    events_with_both = [e for e in summary['events'] if e['before_count'] > 0 and e['after_count'] > 0]
+    # Analyze before/after patterns with boolean masks over the event table
+    events = summary['events']
+    ev = pd.DataFrame(events, columns=['event', 'directory', 'before_count', 'after_count'])
+    before_counts = ev['before_count'].to_numpy(dtype=np.int64)
+    after_counts = ev['after_count'].to_numpy(dtype=np.int64)
+    bmask = before_counts > 0
+    amask = after_counts > 0
+    events_with_before = [events[i] for i in np.flatnonzero(bmask)]
+    events_with_after = [events[i] for i in np.flatnonzero(amask)]
+    events_with_both = [events[i] for i in np.flatnonzero(bmask & amask)]
     
     print(f"\nEvent Pattern Analysis:")
     print(f"Events with foreshocks (before): {len(events_with_before)} ({len(events_with_before)/len(summary['events'])*100:.1f}%)")
     print(f"Events with aftershocks (after): {len(events_with_after)} ({len(events_with_after)/len(summary['events'])*100:.1f}%)")
     print(f"Events with both fore- and aftershocks: {len(events_with_both)} ({len(events_with_both)/len(summary['events'])*100:.1f}%)")
     
-    # Find events with most activity
-    top_before = sorted(summary['events'], key=lambda x: x['before_count'], reverse=True)[:10]
-    top_after = sorted(summary['events'], key=lambda x: x['after_count'], reverse=True)[:10]
+    # Find events with most activity (partial selection, no full sort)
+    top_before = heapq.nlargest(10, summary['events'], key=lambda x: x['before_count'])
+    top_after = heapq.nlargest(10, summary['events'], key=lambda x: x['after_count'])
     
     print(f"\nTop 10 Events with Most Foreshocks:")
     for i, event in enumerate(top_before, 1):
@@ -55,33 +61,25 @@ def analyze_event_data(event_analysis_dir):
         if event['after_count'] > 0:
             print(f"{i:2d}. {event['event'][:60]}... - {event['after_count']} aftershocks")
     
-    # Analyze by time periods
-    events_by_decade = {}
-    for event in summary['events']:
-        # Extract year from directory name (format: event_YYYYMMDD_...)
-        try:
-            dir_parts = event['directory'].split('_')
-            if len(dir_parts) >= 2 and dir_parts[1].isdigit() and len(dir_parts[1]) >= 4:
-                year = int(dir_parts[1][:4])
-            else:
-                # Skip events with invalid directory format
-                continue
-            decade = (year // 10) * 10
-        except (ValueError, IndexError):
-            # Skip events with invalid directory format
-            continue
-        
-        if decade not in events_by_decade:
-            events_by_decade[decade] = {'total': 0, 'with_before': 0, 'with_after': 0, 'before_total': 0, 'after_total': 0}
-        
-        events_by_decade[decade]['total'] += 1
-        events_by_decade[decade]['before_total'] += event['before_count']
-        events_by_decade[decade]['after_total'] += event['after_count']
-        
-        if event['before_count'] > 0:
-            events_by_decade[decade]['with_before'] += 1
-        if event['after_count'] > 0:
-            events_by_decade[decade]['with_after'] += 1
+    # Analyze by time periods: the year comes from the event directory name
+    # (format: event_YYYYMMDD_...); events with another format are skipped
+    year = ev['directory'].str.extract(r'(?:^|[\\/])event_(\d{4})\d*(?:_|$)', expand=False)
+    valid = year.notna().to_numpy()
+    by_decade = ev[valid].assign(
+        decade=(year[valid].astype(int) // 10) * 10,
+        has_before=bmask[valid],
+        has_after=amask[valid]
+    ).groupby('decade').agg(
+        total=('event', 'size'),
+        with_before=('has_before', 'sum'),
+        with_after=('has_after', 'sum'),
+        before_total=('before_count', 'sum'),
+        after_total=('after_count', 'sum')
+    )
+    events_by_decade = {
+        int(decade): {column: int(value) for column, value in row.items()}
+        for decade, row in by_decade.to_dict('index').items()
+    }
     
     print(f"\nAnalysis by Decade:")
     print(f"{'Decade':<10} {'Events':<8} {'W/Fore':<8} {'W/After':<9} {'Total Fore':<12} {'Total After':<12}")
@@ -97,15 +95,21 @@ def analyze_event_data(event_analysis_dir):
         'events_with_both': events_with_both,
         'top_before': top_before[:10],
         'top_after': top_after[:10],
-        'by_decade': events_by_decade
+        'by_decade': events_by_decade,
+        'before_counts': before_counts,
+        'after_counts': after_counts
     }
 
 def create_visualization(analysis_results, output_dir):
     """Create visualizations of the analysis results."""
+    # Imported here so runs without plots (--no-plot) never load matplotlib
+    import matplotlib
+    matplotlib.use('Agg')  # render straight to file; no GUI needed for batch runs
+    import matplotlib.pyplot as plt
     
     # Set up the plotting style
     plt.style.use('default')
-    fig, axes = plt.subplots(2, 2, figsize=(15, 12))
+    fig, axes = plt.subplots(2, 2, figsize=(15, 12), constrained_layout=True)
     fig.suptitle('Earthquake Event Analysis: Before and After Major Events', fontsize=16, fontweight='bold')
     
     # 1. Pie chart of event patterns
@@ -167,13 +171,14 @@ def create_visualization(analysis_results, output_dir):
     
     # 4. Scatter plot of before vs after counts
     ax4 = axes[1, 1]
-    before_counts = [e['before_count'] for e in analysis_results['summary']['events']]
-    after_counts = [e['after_count'] for e in analysis_results['summary']['events']]
+    before_counts = analysis_results['before_counts']
+    after_counts = analysis_results['after_counts']
     
     # Only plot events that have some activity
-    active_events = [(b, a) for b, a in zip(before_counts, after_counts) if b > 0 or a > 0]
-    if active_events:
-        before_active, after_active = zip(*active_events)
+    active = (before_counts > 0) | (after_counts > 0)
+    before_active = before_counts[active]
+    after_active = after_counts[active]
+    if before_active.size:
         ax4.scatter(before_active, after_active, alpha=0.6, s=30, color='purple')
     
     ax4.set_xlabel('Foreshocks Count')
@@ -182,22 +187,26 @@ def create_visualization(analysis_results, output_dir):
     ax4.grid(True, alpha=0.3)
     
     # Add correlation info if there's enough data
-    if len(active_events) > 1:
+    if before_active.size > 1:
         corr = np.corrcoef(before_active, after_active)[0, 1]
         ax4.text(0.05, 0.95, f'Correlation: {corr:.3f}', transform=ax4.transAxes, 
                 bbox=dict(boxstyle='round', facecolor='white', alpha=0.8))
     
-    plt.tight_layout()
-    
-    # Save the visualization
+    # Save the visualization (constrained layout already fits the figure,
+    # so no extra bbox_inches='tight' render pass)
     output_file = os.path.join(output_dir, 'earthquake_analysis_visualization.png')
-    plt.savefig(output_file, dpi=300, bbox_inches='tight')
-    plt.show()
+    fig.savefig(output_file, dpi=150)
+    plt.close(fig)
     
     print(f"\nVisualization saved to: {output_file}")
 
 def main():
     """Main analysis function."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--plot', action=argparse.BooleanOptionalAction, default=True,
+                        help='render earthquake_analysis_visualization.png (default: on)')
+    args = parser.parse_args()
+    
     event_analysis_dir = 'event_analysis'
     
     if not os.path.exists(event_analysis_dir):
@@ -209,11 +218,12 @@ def main():
     analysis_results = analyze_event_data(event_analysis_dir)
     
     # Create visualizations
-    try:
-        create_visualization(analysis_results, event_analysis_dir)
-    except Exception as e:
-        print(f"Warning: Could not create visualizations: {e}")
-        print("Analysis completed successfully, but visualization failed.")
+    if args.plot:
+        try:
+            create_visualization(analysis_results, event_analysis_dir)
+        except Exception as e:
+            print(f"Warning: Could not create visualizations: {e}")
+            print("Analysis completed successfully, but visualization failed.")
     
     # Save detailed analysis results
     output_file = os.path.join(event_analysis_dir, 'detailed_analysis.json')
@@ -236,10 +246,10 @@ def main():
     print(f"\nDetailed analysis saved to: {output_file}")
     print(f"\n=== Analysis Complete ===")
     print(f"Data for {analysis_results['summary']['total_events_processed']} major earthquake events has been extracted and analyzed.")
+    print(f"Event metadata for all events: event_metadata.jsonl")
     print(f"Each event folder contains:")
-    print(f"  - Event metadata (event_metadata.json)")
-    print(f"  - Before event data (before_event.csv) - if foreshocks exist")
-    print(f"  - After event data (after_event.csv) - if aftershocks exist")
+    print(f"  - Before event data (before_event.csv or .parquet) - if foreshocks exist")
+    print(f"  - After event data (after_event.csv or .parquet) - if aftershocks exist")
 
 if __name__ == "__main__":
     main()
@@ -10,15 +10,146 @@ import numpy as np
 from datetime import datetime, timedelta
 import os
 import json
+import multiprocessing as mp
 
-def load_earthquake_data(file_path):
-    """Load earthquake data from CSV file."""
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# pandas reads CSV with pyarrow's multithreaded parser when it is installed
+try:
+    import pyarrow  # noqa: F401
+    CSV_ENGINE = 'pyarrow'
+except ImportError:
+    CSV_ENGINE = 'c'
+
+EARTH_RADIUS_KM = 6371.0
+
+# Format of the per-event before/after tables: 'csv', or 'parquet' for
+# smaller binary columnar files (needs pyarrow)
+EVENT_FILE_FORMAT = 'csv'
+
+# Compact dtypes for the numeric columns used by the filters: half the
+# memory and bytes scanned of the float64/int64 that read_csv produces
+NUMERIC_DTYPES = {
+    'magnitude': 'float32',
+    'depth': 'float32',
+    'latitude': 'float32',
+    'longitude': 'float32',
+    'sig': 'int32'
+}
+
+# Location name to directory name in one pass: separators and characters
+# not allowed in paths become '_', '?' is dropped
+_LOCATION_TABLE = str.maketrans({**{c: '_' for c in ', /\\:*"<>|'}, '?': None})
+
+def haversine_mask(lat, lon, lat0, lon0, radius_km):
+    """
+    Boolean mask of the points (lat, lon arrays in degrees) within radius_km
+    great-circle distance of (lat0, lon0). Runs in place on two float64
+    scratch arrays (also for float32 input); points with missing
+    coordinates are never within the radius.
+    """
+    lat0, lon0 = np.radians(lat0), np.radians(lon0)
+    
+    # sin(dlon/2)**2 * cos(lat) * cos(lat0)
+    a = np.radians(lon, dtype=np.float64)
+    a -= lon0
+    a *= 0.5
+    np.sin(a, out=a)
+    np.square(a, out=a)
+    phi = np.radians(lat, dtype=np.float64)
+    a *= np.cos(phi)
+    a *= np.cos(lat0)
+    
+    # + sin(dlat/2)**2
+    phi -= lat0
+    phi *= 0.5
+    np.sin(phi, out=phi)
+    np.square(phi, out=phi)
+    a += phi
+    
+    # Compare the haversine term with that of the radius, so no arcsin is needed
+    limit = np.sin(min(radius_km / EARTH_RADIUS_KM, np.pi) / 2) ** 2
+    return a <= limit
+
+def write_json(file_path, data):
+    """Write data as indented JSON, using orjson when it is installed."""
+    if orjson is not None:
+        with open(file_path, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    else:
+        with open(file_path, 'w') as f:
+            json.dump(data, f, indent=2)
+
+def write_jsonl(file_path, records):
+    """Write records as JSON Lines (one object per line) in a single write."""
+    if orjson is not None:
+        with open(file_path, 'wb') as f:
+            f.write(b''.join(orjson.dumps(record) + b'\n' for record in records))
+    else:
+        with open(file_path, 'w') as f:
+            f.write(''.join(json.dumps(record) + '\n' for record in records))
+
+def write_event_table(data, file_base, file_format='csv'):
+    """Write an event table as file_base.csv or file_base.parquet; returns the path."""
+    if file_format == 'parquet':
+        file_path = file_base + '.parquet'
+        data.to_parquet(file_path, engine='pyarrow', compression='snappy', index=False)
+    else:
+        file_path = file_base + '.csv'
+        data.to_csv(file_path, index=False)
+    return file_path
+
+def downcast_columns(df):
+    """Apply NUMERIC_DTYPES to the columns present (integer ones only without gaps)."""
+    dtypes = {
+        column: dtype for column, dtype in NUMERIC_DTYPES.items()
+        if column in df.columns and not (dtype.startswith('int') and df[column].isna().any())
+    }
+    return df.astype(dtypes)
+
+def json_float(value):
+    """Float for JSON output; float32 values keep their short decimal form (7.1, not 7.099999904632568)."""
+    return float(str(value))
+
+def load_earthquake_data(file_path, use_cache=True):
+    """
+    Load earthquake data from CSV file.
+    
+    The parsed and sorted DataFrame is cached next to the CSV as
+    <file_path>.pkl and reused while it is newer than the CSV.
+    """
+    cache_file = file_path + '.pkl'
     try:
-        df = pd.read_csv(file_path)
+        if use_cache:
+            try:
+                if os.path.getmtime(cache_file) >= os.path.getmtime(file_path):
+                    return downcast_columns(pd.read_pickle(cache_file))
+            except Exception:
+                pass  # no cache yet, or a partial/incompatible one; re-parse the CSV
+        
+        df = pd.read_csv(file_path, engine=CSV_ENGINE)
         # Convert date_time to datetime
         df['date_time'] = pd.to_datetime(df['date_time'], format='%d-%m-%Y %H:%M')
         # Sort by date_time
         df = df.sort_values('date_time').reset_index(drop=True)
+        df = downcast_columns(df)
+        
+        if use_cache:
+            # Written under a temporary name and moved into place, so an
+            # interrupted write never leaves a truncated cache behind
+            tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+            try:
+                df.to_pickle(tmp_file)
+                os.replace(tmp_file, cache_file)
+            except OSError as e:
+                print(f"Warning: could not cache parsed data: {e}")
+                try:
+                    os.remove(tmp_file)
+                except OSError:
+                    pass
         return df
     except Exception as e:
         print(f"Error loading data: {e}")
@@ -29,19 +160,20 @@ def identify_major_events(df, magnitude_threshold=7.0, significance_threshold=80
     Identify major earthquake events based on magnitude and significance.
     
     Args:
-        df: DataFrame with earthquake data
+        df: DataFrame with earthquake data, sorted by date_time
         magnitude_threshold: Minimum magnitude to consider as major event
         significance_threshold: Minimum significance score to consider
     
     Returns:
         DataFrame with major events
     """
-    major_events = df[
-        (df['magnitude'] >= magnitude_threshold) | 
-        (df['sig'] >= significance_threshold)
-    ].copy()
+    # One comparison per column over the raw arrays; df is already sorted by
+    # date_time (load_earthquake_data), and row selection keeps that order
+    magnitude = df['magnitude'].to_numpy()
+    sig = df['sig'].to_numpy()
+    mask = (magnitude >= magnitude_threshold) | (sig >= significance_threshold)
     
-    return major_events.sort_values('date_time')
+    return df.iloc[np.flatnonzero(mask)]
 
 def extract_before_after_data(df, event_date, days_before=30, days_after=30, 
                             radius_km=500, event_lat=None, event_lon=None):
@@ -49,7 +181,7 @@ def extract_before_after_data(df, event_date, days_before=30, days_after=30,
     Extract earthquake data before and after a specific event.
     
     Args:
-        df: Full earthquake dataset
+        df: Full earthquake dataset, sorted by date_time
         event_date: Date of the main event
         days_before: Number of days before the event to include
         days_after: Number of days after the event to include
@@ -63,26 +195,29 @@ def extract_before_after_data(df, event_date, days_before=30, days_after=30,
     start_date = event_date - timedelta(days=days_before)
     end_date = event_date + timedelta(days=days_after)
     
-    # Filter by date range
-    period_data = df[
-        (df['date_time'] >= start_date) & 
-        (df['date_time'] <= end_date)
-    ].copy()
+    # Row bounds of the date range and of the event itself by binary search
+    # on the sorted date_time column, instead of comparing every row
+    times = df['date_time'].to_numpy()
+    bounds = np.array([start_date, event_date, event_date, end_date], dtype=times.dtype)
+    start, event_first = np.searchsorted(times, bounds[:2], side='left')
+    event_last, end = np.searchsorted(times, bounds[2:], side='right')
+    
+    # Before: [start, event_first), after: [event_last, end)
+    before_idx = np.arange(start, event_first)
+    after_idx = np.arange(event_last, end)
     
     # If coordinates are provided, filter by geographic proximity
     if event_lat is not None and event_lon is not None:
-        # Simple distance calculation (approximation)
-        # Convert radius from km to degrees (rough approximation: 1 degree ≈ 111 km)
-        radius_deg = radius_km / 111.0
-        
-        period_data = period_data[
-            (abs(period_data['latitude'] - event_lat) <= radius_deg) &
-            (abs(period_data['longitude'] - event_lon) <= radius_deg)
-        ]
+        # Great-circle distance, for only the rows of the date range
+        lat = df['latitude'].to_numpy()[start:end]
+        lon = df['longitude'].to_numpy()[start:end]
+        nearby = haversine_mask(lat, lon, event_lat, event_lon, radius_km)
+        before_idx = before_idx[nearby[:event_first - start]]
+        after_idx = after_idx[nearby[event_last - start:]]
     
     # Split into before and after
-    before_data = period_data[period_data['date_time'] < event_date]
-    after_data = period_data[period_data['date_time'] > event_date]
+    before_data = df.iloc[before_idx]
+    after_data = df.iloc[after_idx]
     
     return {
         'before': before_data,
@@ -92,40 +227,46 @@ def extract_before_after_data(df, event_date, days_before=30, days_after=30,
         'total_after': len(after_data)
     }
 
-def save_event_data(event_data, event_info, output_dir):
-    """Save before/after data for a specific event."""
+def save_event_data(event_data, event_info, output_dir, file_format='csv'):
+    """
+    Save before/after data for a specific event, as CSV or Parquet files
+    (file_format 'csv' or 'parquet').
+    
+    Returns:
+        (event directory, event metadata dict); main() collects the metadata
+        of all events into one event_metadata.jsonl
+    """
     # Create event-specific directory
     event_date_str = event_info['date_time'].strftime('%Y%m%d_%H%M')
     magnitude = event_info['magnitude']
     # Clean location name for valid directory name
     location_raw = event_info['location'] if pd.notna(event_info['location']) else 'Unknown_Location'
-    location = str(location_raw).replace(',', '_').replace(' ', '_').replace('?', '').replace('/', '_').replace('\\', '_').replace(':', '_').replace('*', '_').replace('"', '_').replace('<', '_').replace('>', '_').replace('|', '_')[:50]
+    location = str(location_raw).translate(_LOCATION_TABLE)[:50]
     
-    event_dir = os.path.join(output_dir, f"event_{event_date_str}_M{magnitude}_{location}")
+    event_dir = os.path.join(output_dir, f"event_{event_date_str}_M{magnitude!s}_{location}")
     os.makedirs(event_dir, exist_ok=True)
     
     # Save before data
     if not event_data['before'].empty:
-        before_file = os.path.join(event_dir, 'before_event.csv')
-        event_data['before'].to_csv(before_file, index=False)
+        before_file = write_event_table(event_data['before'], os.path.join(event_dir, 'before_event'), file_format)
         print(f"Saved {len(event_data['before'])} records before event to: {before_file}")
     
     # Save after data
     if not event_data['after'].empty:
-        after_file = os.path.join(event_dir, 'after_event.csv')
-        event_data['after'].to_csv(after_file, index=False)
+        after_file = write_event_table(event_data['after'], os.path.join(event_dir, 'after_event'), file_format)
         print(f"Saved {len(event_data['after'])} records after event to: {after_file}")
     
-    # Save event metadata
+    # Event metadata
     metadata = {
+        'directory': event_dir,
         'main_event': {
             'title': event_info['title'] if pd.notna(event_info['title']) else 'Unknown',
-            'magnitude': float(event_info['magnitude']) if pd.notna(event_info['magnitude']) else 0.0,
+            'magnitude': json_float(event_info['magnitude']) if pd.notna(event_info['magnitude']) else 0.0,
             'date_time': event_info['date_time'].isoformat(),
-            'latitude': float(event_info['latitude']) if pd.notna(event_info['latitude']) else None,
-            'longitude': float(event_info['longitude']) if pd.notna(event_info['longitude']) else None,
+            'latitude': json_float(event_info['latitude']) if pd.notna(event_info['latitude']) else None,
+            'longitude': json_float(event_info['longitude']) if pd.notna(event_info['longitude']) else None,
             'location': str(event_info['location']) if pd.notna(event_info['location']) else 'Unknown Location',
-            'depth': float(event_info['depth']) if pd.notna(event_info['depth']) else None,
+            'depth': json_float(event_info['depth']) if pd.notna(event_info['depth']) else None,
             'significance': int(event_info['sig']) if pd.notna(event_info['sig']) else None
         },
         'analysis_parameters': {
@@ -139,11 +280,50 @@ def save_event_data(event_data, event_info, output_dir):
         }
     }
     
-    metadata_file = os.path.join(event_dir, 'event_metadata.json')
-    with open(metadata_file, 'w') as f:
-        json.dump(metadata, f, indent=2)
+    return event_dir, metadata
+
+# Full dataset of the current worker process, set once by init_worker
+_worker_df = None
+
+def init_worker(df):
+    """Pool initializer: receive the dataset once per worker, not per task."""
+    global _worker_df
+    _worker_df = df
+
+def process_event(args):
+    """
+    Extract and save the before/after data of one major event.
+    
+    Args:
+        args: (event, output_dir, file_format) tuple, event being a row of the
+            major events
+    
+    Returns:
+        (summary dict for the processing report, event metadata dict)
+    """
+    event, output_dir, file_format = args
+    print(f"\nProcessing event: {event['title']}")
+    print(f"Date: {event['date_time']}, Magnitude: {event['magnitude']!s}")
+    
+    # Extract before/after data
+    event_data = extract_before_after_data(
+        _worker_df, 
+        event['date_time'],
+        days_before=30,
+        days_after=30,
+        radius_km=500,
+        event_lat=event['latitude'],
+        event_lon=event['longitude']
+    )
     
-    return event_dir
+    # Save the data
+    event_dir, metadata = save_event_data(event_data, event, output_dir, file_format)
+    return {
+        'event': event['title'],
+        'directory': event_dir,
+        'before_count': event_data['total_before'],
+        'after_count': event_data['total_after']
+    }, metadata
 
 def main():
     """Main function to process earthquake data."""
@@ -168,32 +348,25 @@ def main():
     # Create output directory
     os.makedirs(output_dir, exist_ok=True)
     
-    # Process each major event
-    processed_events = []
+    # Process the major events in parallel; they are independent. imap keeps
+    # the summary in event order.
+    # Rows as dicts of the column scalars; unlike iterrows (which upcasts
+    # to float64), this keeps float32 values float32, so they print as in
+    # the CSV (7.1, not 7.099999904632568)
+    columns = list(major_events.columns)
+    tasks = [
+        (dict(zip(columns, event)), output_dir, EVENT_FILE_FORMAT)
+        for event in zip(*(major_events[column].array for column in columns))
+    ]
+    processes = max(1, min(mp.cpu_count(), len(tasks)))
+    chunksize = max(1, len(tasks) // (4 * processes))
+    with mp.Pool(processes, initializer=init_worker, initargs=(df,)) as pool:
+        results = list(pool.imap(process_event, tasks, chunksize=chunksize))
+    processed_events = [event for event, _ in results]
     
-    for idx, event in major_events.iterrows():
-        print(f"\nProcessing event: {event['title']}")
-        print(f"Date: {event['date_time']}, Magnitude: {event['magnitude']}")
-        
-        # Extract before/after data
-        event_data = extract_before_after_data(
-            df, 
-            event['date_time'],
-            days_before=30,
-            days_after=30,
-            radius_km=500,
-            event_lat=event['latitude'],
-            event_lon=event['longitude']
-        )
-        
-        # Save the data
-        event_dir = save_event_data(event_data, event, output_dir)
-        processed_events.append({
-            'event': event['title'],
-            'directory': event_dir,
-            'before_count': event_data['total_before'],
-            'after_count': event_data['total_after']
-        })
+    # Metadata of all events in one file rather than one small file per event
+    metadata_file = os.path.join(output_dir, 'event_metadata.jsonl')
+    write_jsonl(metadata_file, (metadata for _, metadata in results))
     
     # Create summary report
     summary_file = os.path.join(output_dir, 'processing_summary.json')
@@ -203,12 +376,12 @@ def main():
         'events': processed_events
     }
     
-    with open(summary_file, 'w') as f:
-        json.dump(summary, f, indent=2)
+    write_json(summary_file, summary)
     
     print(f"\n=== Processing Complete ===")
     print(f"Processed {len(processed_events)} major events")
     print(f"Data saved to: {output_dir}")
+    print(f"Event metadata saved to: {metadata_file}")
     print(f"Summary saved to: {summary_file}")
     
     # Display summary